@@ -0,0 +1,46 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from analytics.models import SearchHistory
+
+from .models import User
+
+
+class UsersListViewQueryCountTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "admin", email="admin@example.com", password="admin-pass", role=User.ROLE_ADMIN
+        )
+        self.client.force_authenticate(self.admin)
+
+    def _create_users(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(f"user{i}", email=f"user{i}@example.com")
+            SearchHistory.objects.bulk_create(
+                SearchHistory(user=user, query=f"Analyze area {j}") for j in range(i % 3)
+            )
+
+    def _list_users(self):
+        response = self.client.get(reverse("admin-users"), {"page_size": 200})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_users(self):
+        n = 5
+        self._create_users(n)
+        with self.assertNumQueries(2) as small:  # page count + annotated page
+            body = self._list_users()
+        self.assertEqual(body["count"], n + 1)
+
+        self._create_users(10 * n - n)
+        with self.assertNumQueries(len(small.captured_queries)):
+            body = self._list_users()
+        self.assertEqual(body["count"], 10 * n + 1)
+
+    def test_history_counts_are_annotated(self):
+        self._create_users(4)
+        counts = {
+            row["user"]["username"]: row["history_count"] for row in self._list_users()["users"]
+        }
+        self.assertEqual(counts, {"admin": 0, "user1": 1, "user2": 2, "user3": 0, "user4": 1})
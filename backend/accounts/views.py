@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -11,6 +13,8 @@ from rest_framework.permissions import AllowAny
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
+from analytics.models import ResponsePayload
+
 from .serializers import (
     RegisterSerializer,
     LoginSerializer,
@@ -87,22 +91,63 @@ class MeView(APIView):
 
 
 class UsersListView(APIView):
+    """
+    Admin user list with history counts, fetched in one annotated query.
+
+    Query params: page, page_size (max USERS_MAX_PAGE_SIZE),
+    search (username/email substring), ordering (see ORDERING_FIELDS).
+    """
     permission_classes = [IsAuthenticated, IsAdmin]
 
-    def get(self, request):
-        from analytics.models import SearchHistory  # avoid circular import
+    ORDERING_FIELDS = {"created_at", "username", "email", "history_count"}
 
-        users = User.objects.all().order_by("-created_at")
-        data = []
-        for u in users:
-            history_count = SearchHistory.objects.filter(user=u).count()
-            data.append(
+    def get(self, request):
+        ordering = request.query_params.get("ordering") or "-created_at"
+        if ordering.lstrip("-") not in self.ORDERING_FIELDS:
+            return Response(
                 {
-                    "user": UserSerializer(u).data,
-                    "history_count": history_count,
-                }
+                    "success": False,
+                    "message": f"ordering must be one of: {', '.join(sorted(self.ORDERING_FIELDS))} "
+                    "(prefix with - for descending).",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        return Response({"success": True, "users": data})
+
+        try:
+            page_size = int(request.query_params.get("page_size") or settings.USERS_PAGE_SIZE)
+        except ValueError:
+            page_size = settings.USERS_PAGE_SIZE
+        page_size = max(1, min(page_size, settings.USERS_MAX_PAGE_SIZE))
+
+        users = User.objects.annotate(history_count=Count("history"))
+
+        search = (request.query_params.get("search") or "").strip()
+        if search:
+            users = users.filter(Q(username__icontains=search) | Q(email__icontains=search))
+
+        # id as tie-breaker keeps pages stable
+        users = users.order_by(ordering, "-id")
+
+        paginator = Paginator(users, page_size)
+        page = paginator.get_page(request.query_params.get("page"))
+
+        data = [
+            {
+                "user": UserSerializer(u).data,
+                "history_count": u.history_count,
+            }
+            for u in page.object_list
+        ]
+        return Response(
+            {
+                "success": True,
+                "users": data,
+                "count": paginator.count,
+                "page": page.number,
+                "num_pages": paginator.num_pages,
+                "page_size": page_size,
+            }
+        )
 
 
 class ChangeUserRoleView(APIView):
@@ -183,7 +228,10 @@ class DeleteUserView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        digests = set(target.history.values_list("payload_id", flat=True))
         target.delete()
+        # Drop the user's stored responses no other history row shares
+        ResponsePayload.prune(digests=digests - {None})
 
         return Response(
             {"success": True, "message": "User deleted successfully."},
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import ResponsePayload
+
+
+class Command(BaseCommand):
+    help = "Delete stored analyze responses that no search history row references."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age-seconds",
+            type=float,
+            default=None,
+            help="Keep payloads younger than this (default: HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = ResponsePayload.prune(min_age_seconds=options["min_age_seconds"])
+        self.stdout.write(f"Deleted {deleted} unreferenced payloads.")
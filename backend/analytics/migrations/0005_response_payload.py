@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_searchhistory_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponsePayload',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(max_length=10)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='searchhistory',
+            name='payload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='histories', to='analytics.responsepayload'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import migrations
+
+from analytics.utils.payload_codec import decode_payload, encode_payload
+
+BATCH_SIZE = 500
+
+
+def _batches(pks):
+    for start in range(0, len(pks), BATCH_SIZE):
+        yield pks[start : start + BATCH_SIZE]
+
+
+def forwards(apps, schema_editor):
+    SearchHistory = apps.get_model("analytics", "SearchHistory")
+    ResponsePayload = apps.get_model("analytics", "ResponsePayload")
+
+    # The rows are rewritten below, so collect their ids before touching any
+    pks = list(
+        SearchHistory.objects.filter(payload__isnull=True, full_response__isnull=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    for batch in _batches(pks):
+        payloads = {}
+        histories = list(SearchHistory.objects.filter(pk__in=batch).only("id", "full_response"))
+        for history in histories:
+            digest, codec, data, size = encode_payload(
+                history.full_response, settings.HISTORY_PAYLOAD_CODEC
+            )
+            payloads.setdefault(
+                digest, ResponsePayload(digest=digest, codec=codec, data=data, size=size)
+            )
+            history.payload_id = digest
+            history.full_response = None
+        ResponsePayload.objects.bulk_create(payloads.values(), ignore_conflicts=True)
+        SearchHistory.objects.bulk_update(histories, ["payload", "full_response"])
+
+
+def backwards(apps, schema_editor):
+    SearchHistory = apps.get_model("analytics", "SearchHistory")
+
+    pks = list(
+        SearchHistory.objects.filter(payload__isnull=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    for batch in _batches(pks):
+        histories = list(SearchHistory.objects.filter(pk__in=batch).select_related("payload"))
+        for history in histories:
+            history.full_response = decode_payload(history.payload.codec, history.payload.data)
+            history.payload = None
+        SearchHistory.objects.bulk_update(histories, ["payload", "full_response"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_response_payload'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
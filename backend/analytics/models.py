@@ -1,18 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from .utils.payload_codec import decode_payload, encode_payload
+
 User = get_user_model()
 
+
+class ResponsePayload(models.Model):
+    """
+    Content-addressed, compressed analyze response. Identical responses are
+    stored once and shared by every SearchHistory row that produced them.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)  # sha256 of canonical JSON
+    codec = models.CharField(max_length=10)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()  # uncompressed bytes
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def build(cls, payload) -> "ResponsePayload":
+        digest, codec, data, size = encode_payload(payload, settings.HISTORY_PAYLOAD_CODEC)
+        return cls(digest=digest, codec=codec, data=data, size=size)
+
+    def decode(self):
+        return decode_payload(self.codec, self.data)
+
+    @classmethod
+    def prune(cls, digests=None, min_age_seconds=None) -> int:
+        """
+        Delete payloads no SearchHistory row references any more, optionally
+        only among `digests`. Payloads younger than `min_age_seconds`
+        (HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS) are kept: a history writer may
+        be about to reuse one. Returns the number deleted.
+        """
+        if min_age_seconds is None:
+            min_age_seconds = settings.HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS
+        qs = cls.objects.filter(
+            ~Exists(SearchHistory.objects.filter(payload_id=OuterRef("pk"))),
+            created_at__lt=timezone.now() - timedelta(seconds=min_age_seconds),
+        )
+        if digests is not None:
+            qs = qs.filter(digest__in=list(digests))
+        deleted, _ = qs.delete()
+        return deleted
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.codec}, {self.size} bytes)"
+
+
 class SearchHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="history")
     query = models.TextField()
     summary = models.TextField(blank=True, null=True)
-    full_response = models.JSONField(null=True, blank=True)  # ← stores charts, tables, everything
+    full_response = models.JSONField(null=True, blank=True)  # legacy rows; new rows use payload
+    payload = models.ForeignKey(
+        ResponsePayload,
+        on_delete=models.PROTECT,
+        related_name="histories",
+        null=True,
+        blank=True,
+    )  # ← stores charts, tables, everything (compressed, deduplicated)
     intent_type = models.CharField(max_length=100, blank=True, null=True)
     areas = models.CharField(max_length=255, blank=True, null=True)
     time_window = models.CharField(max_length=100, blank=True, null=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set from the request time by the history writer, not the (later) insert time
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Keyset pagination seeks on (created_at, id), per user and globally
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="history_user_created_idx"),
+            models.Index(fields=["-created_at", "-id"], name="history_created_idx"),
+        ]
+
+    def get_full_response(self):
+        if self.payload_id is not None:
+            return self.payload.decode()
+        return self.full_response
 
     def __str__(self):
         return f"{self.user.username} - {self.query[:30]}"
+
+
+class SummaryCacheEntry(models.Model):
+    """Persisted LLM summary, keyed by a hash of (intent, insights, model, prompt version)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    summary = models.TextField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model} - {self.key[:12]}"
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+
+class InvalidPageParams(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, pk = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidPageParams("Invalid cursor.") from e
+
+
+def parse_page_params(query_params) -> Tuple[Optional[str], int]:
+    """Read ?cursor= and ?page_size= (clamped to HISTORY_MAX_PAGE_SIZE)."""
+    cursor = query_params.get("cursor") or None
+    raw_size = query_params.get("page_size")
+    if raw_size in (None, ""):
+        return cursor, settings.HISTORY_PAGE_SIZE
+    try:
+        page_size = int(raw_size)
+    except ValueError as e:
+        raise InvalidPageParams("page_size must be an integer.") from e
+    if page_size < 1:
+        raise InvalidPageParams("page_size must be positive.")
+    return cursor, min(page_size, settings.HISTORY_MAX_PAGE_SIZE)
+
+
+def keyset_page(qs: QuerySet, cursor: Optional[str], page_size: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Newest-first page of `qs` after `cursor`, seeking on (created_at, id)
+    so the cost is O(page_size) no matter how deep the page is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    qs = qs.order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(qs[: page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
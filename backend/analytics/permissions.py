@@ -0,0 +1,13 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+class HasMetricsToken(BasePermission):
+    """Scrapers authenticate with an X-Metrics-Token header matching METRICS_TOKEN."""
+
+    def has_permission(self, request, view):
+        expected = settings.METRICS_TOKEN
+        supplied = request.headers.get("X-Metrics-Token", "")
+        return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
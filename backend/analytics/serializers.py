@@ -1,21 +1,46 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import SearchHistory
+from .services.ingestion import INGEST_MODES
+from .utils.analytics_core import TABLE_FORMATS
 
 
 class AnalyzeRequestSerializer(serializers.Serializer):
     query = serializers.CharField(allow_blank=False, max_length=500)
+    # "columns" returns the table as {"columns": [...], "data": {col: [...]}}
+    table_format = serializers.ChoiceField(choices=TABLE_FORMATS, default="rows", required=False)
+    summary_mode = serializers.ChoiceField(
+        choices=["sync", "deferred", "stream"], default="sync", required=False
+    )
+
+
+class AnalyzeBatchRequestSerializer(serializers.Serializer):
+    # Blank queries are reported per query (INVALID_QUERY), not as a bad request
+    queries = serializers.ListField(
+        child=serializers.CharField(allow_blank=True, max_length=500),
+        allow_empty=False,
+        max_length=settings.ANALYZE_BATCH_MAX_QUERIES,
+    )
+    table_format = serializers.ChoiceField(choices=TABLE_FORMATS, default="rows", required=False)
+    summary_mode = serializers.ChoiceField(choices=["sync", "deferred"], default="sync", required=False)
 
 
 class DatasetUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    mode = serializers.ChoiceField(choices=INGEST_MODES, default="replace", required=False)
 
     def validate_file(self, value):
-        if not value.name.lower().endswith((".xlsx", ".xls")):
-            raise serializers.ValidationError("Only Excel files (.xlsx, .xls) are allowed.")
+        if not value.name.lower().endswith((".xlsx", ".xls", ".csv", ".parquet")):
+            raise serializers.ValidationError(
+                "Only Excel (.xlsx, .xls), CSV or Parquet files are allowed."
+            )
         return value
 
 
 class SearchHistorySerializer(serializers.ModelSerializer):
+    # Decompressed from the shared payload (or the legacy JSON column)
+    full_response = serializers.SerializerMethodField()
+
     class Meta:
         model = SearchHistory
         fields = [
@@ -26,4 +51,8 @@ class SearchHistorySerializer(serializers.ModelSerializer):
             "areas",
             "time_window",
             "created_at",
+            "full_response",
         ]
+
+    def get_full_response(self, obj):
+        return obj.get_full_response()
@@ -1,33 +1,97 @@
 import os
 import json
-from typing import Dict, Any
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
 
 from django.conf import settings
 
+from .circuit_breaker import CircuitBreaker
+from .summary_cache import SummaryCache, make_summary_key
+
+logger = logging.getLogger(__name__)
+
 try:
     from openai import OpenAI
     client = OpenAI(api_key=settings.OPENAI_API_KEY)
 except Exception:
     client = None  # graceful fallback if openai not installed or misconfigured
 
+# Bump when the prompt below changes so cached summaries are not reused
+PROMPT_VERSION = 1
+
+# Shared by all requests in this process: after repeated failures/timeouts
+# the LLM is skipped until a periodic probe succeeds
+llm_circuit = CircuitBreaker(
+    failure_threshold=settings.OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.OPENAI_CIRCUIT_RESET_SECONDS,
+)
+
+# LLM calls run here so the request can stop waiting at its deadline
+_llm_executor = ThreadPoolExecutor(
+    max_workers=settings.OPENAI_MAX_CONCURRENCY, thread_name_prefix="llm"
+)
+
 
 class AISummarizer:
     """
-    Generates AI-written summary using OpenAI GPT-4o-mini.
+    Generates AI-written summary using OpenAI (OPENAI_SUMMARY_MODEL).
     Falls back to rule-based summary if API call fails.
+
+    LLM summaries are cached persistently (SummaryCache) by a hash of
+    intent, insights, model and prompt version. Any object exposing
+    `chat.completions.create(...)` can be passed as `llm_client`, e.g. a
+    local stub in tests.
+
+    Latency is bounded: the LLM call gets `deadline` seconds
+    (OPENAI_SUMMARY_DEADLINE_SECONDS) before the rule-based summary is
+    returned instead, and while the circuit breaker is open the LLM is not
+    called at all.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        llm_client: Any = None,
+        model: Optional[str] = None,
+        cache: Optional[SummaryCache] = None,
+        deadline: Optional[float] = None,
+        circuit: Optional[CircuitBreaker] = None,
+    ):
         self.api_key = settings.OPENAI_API_KEY
+        if llm_client is not None:
+            self.client = llm_client
+        else:
+            self.client = client if self.api_key else None
+        self.model = model or settings.OPENAI_SUMMARY_MODEL
+        self.cache = cache if cache is not None else SummaryCache()
+        self.deadline = settings.OPENAI_SUMMARY_DEADLINE_SECONDS if deadline is None else deadline
+        self.circuit = circuit if circuit is not None else llm_circuit
 
     def summarize(self, query: str, intent: Dict[str, Any], insights: Dict[str, Any]) -> str:
-        # If OpenAI key exists, try LLM
-        if self.api_key and client:
+        # If an LLM client is configured, try the cache and then the LLM
+        if self.client:
+            cache_key = make_summary_key(intent, insights, self.model, PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            if not self.circuit.allow_request():
+                return self._rule_based_summary(query, intent, insights)
             try:
-              return self._openai_summary(query, intent, insights)
+              future = _llm_executor.submit(self._openai_summary, query, intent, insights)
+              summary = future.result(timeout=self.deadline)
+            except FutureTimeoutError:
+              # Drop the call if it is still queued so it does not hold a worker
+              future.cancel()
+              logger.warning("OpenAI summary exceeded %ss deadline", self.deadline)
+              self.circuit.record_failure()
+              return self._rule_based_summary(query, intent, insights)
             except Exception as e:
-              print("⚠️ OpenAI Error:", e)
+              logger.warning("OpenAI error: %s", e)
+              self.circuit.record_failure()
               return self._rule_based_summary(query, intent, insights)
+            self.circuit.record_success()
+            self.cache.set(cache_key, self.model, summary)
+            return summary
 
         # Otherwise fallback
         return self._rule_based_summary(query, intent, insights)
@@ -57,11 +121,12 @@ class AISummarizer:
             }
         ]
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = self.client.chat.completions.create(
+            model=self.model,
             messages=messages,
             max_tokens=280,
             temperature=0.5,
+            timeout=self.deadline,
         )
 
         return response.choices[0].message.content.strip()
@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from rest_framework import status
+
+from analytics.utils.analytics_core import analyze_intent
+from analytics.utils.query_parser import parse_query_intent
+from analytics.utils.timing import StageTimer, timed
+
+from .data_repository import DataRepository, DatasetSnapshot
+from .result_cache import get_result_cache
+
+
+class AnalysisError(Exception):
+    """A query that cannot be answered; carries the API error code and HTTP status."""
+
+    def __init__(self, code: str, message: str, http_status: int = status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.http_status = http_status
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"code": self.code, "message": self.message}
+
+
+@dataclass
+class QueryAnalysis:
+    query: str
+    intent: Dict[str, Any]
+    cache_key: str
+    # {"summary", "charts", "table", "insights"}; summary is None until generated
+    result: Dict[str, Any]
+
+
+def load_snapshot(timer: Optional[StageTimer] = None) -> DatasetSnapshot:
+    try:
+        with timed(timer, "dataset"):
+            snapshot = DataRepository.get_snapshot()
+    except FileNotFoundError:
+        raise AnalysisError(
+            "DATASET_NOT_FOUND",
+            (
+                "Dataset file is missing. Please upload a new dataset file "
+                "or configure DEFAULT_DATASET_PATH correctly."
+            ),
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+    except ValueError as e:
+        raise AnalysisError("DATASET_INVALID", str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception as e:
+        raise AnalysisError(
+            "DATASET_ERROR",
+            f"Unexpected error when loading dataset: {e}",
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    if snapshot.df.empty:
+        raise AnalysisError(
+            "EMPTY_DATASET",
+            "The current dataset has no records.",
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+    return snapshot
+
+
+def analyze_query(
+    snapshot: DatasetSnapshot,
+    query: str,
+    table_format: str = "rows",
+    timer: Optional[StageTimer] = None,
+    memo: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> QueryAnalysis:
+    """
+    Parse `query` and compute its charts, table and insights against
+    `snapshot`. Identical intents reuse the result cache and, within one
+    batch, the `memo` dict (keyed like the result cache).
+    """
+    df = snapshot.df
+    with timed(timer, "parse"):
+        intent = parse_query_intent(df, query, matcher=snapshot.matcher)
+
+    if intent.get("intent_type") == "invalid":
+        raise AnalysisError(
+            "INVALID_QUERY",
+            "Your query seems empty or invalid. Please try again.",
+        )
+
+    if not intent.get("areas"):
+        raise AnalysisError(
+            "UNKNOWN_LOCALITY",
+            (
+                "I could not find any matching locality in the dataset. "
+                "Please check the spelling or try another area."
+            ),
+            status.HTTP_200_OK,
+        )
+
+    # Identical intents against the same dataset reuse the computed
+    # charts, table and summary
+    result_cache = get_result_cache()
+    cache_key = result_cache.make_key(intent, snapshot.fingerprint, table_format=table_format)
+    result = memo.get(cache_key) if memo is not None else None
+    if result is None:
+        with timed(timer, "cache"):
+            result = result_cache.get(cache_key) if result_cache.enabled else None
+        if timer is not None:
+            timer.tag(cache_hit=result is not None)
+
+    if result is None:
+        analysis = analyze_intent(
+            df,
+            intent,
+            cube=snapshot.cube,
+            table_format=table_format,
+            timer=timer,
+            area_index=snapshot.area_index,
+        )
+
+        if analysis["filtered_df"].empty:
+            raise AnalysisError(
+                "NO_DATA_FOR_FILTER",
+                (
+                    "I found the locality, but there is no data matching "
+                    "the specified time window or filters."
+                ),
+                status.HTTP_200_OK,
+            )
+
+        result = {
+            "summary": None,
+            "charts": analysis["charts"],
+            "table": analysis["table"],
+            "insights": analysis["insights"],
+        }
+
+    if memo is not None:
+        memo[cache_key] = result
+    return QueryAnalysis(query=query, intent=intent, cache_key=cache_key, result=result)
+
+
+def build_response_data(analysis: QueryAnalysis, summary: Optional[str]) -> Dict[str, Any]:
+    """The response body that is returned and stored in the user's history."""
+    return {
+        "query": analysis.query,
+        "intent": analysis.intent,
+        "summary": summary,
+        "charts": analysis.result["charts"],
+        "table": analysis.result["table"],
+    }
@@ -1,38 +1,386 @@
+import itertools
+import logging
+import os
 import threading
-from typing import Optional
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Optional
 
 import pandas as pd
 from django.conf import settings
 
-from analytics.utils.data_loader import load_dataset_from_path
+from analytics.utils.analytics_core import (
+    AreaIndex,
+    build_area_index,
+    build_area_year_cube,
+    merge_by_area_year,
+    sort_by_area_year,
+    update_area_year_cube,
+)
+from analytics.utils.area_matcher import AreaMatcher
+from analytics.utils.data_loader import (
+    ProgressCallback,
+    dataset_fingerprint,
+    load_dataset_from_path,
+    merged_fingerprint,
+    report_progress,
+)
+from analytics.utils.shared_frame import open_shared_frame, write_shared_frame
+
+from .dataset_registry import DatasetRegistry
+
+logger = logging.getLogger(__name__)
+
+# Datasets produced by merge_with_file, written next to the delta upload
+MERGED_SUFFIX = ".merged.parquet"
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """An active dataset together with the structures derived from it."""
+
+    df: pd.DataFrame
+    path: str
+    version: int
+    fingerprint: str
+    matcher: AreaMatcher
+    cube: pd.DataFrame
+    area_index: AreaIndex
+    generation: Optional[int] = None
+
 
 class DataRepository:
     """
     Simple in-memory store for the active dataset.
-    Thread-safe enough for typical small deployments.
+
+    Readers never lock: they take the current DatasetSnapshot reference,
+    which is immutable and replaced wholesale. Loaders (first load, upload,
+    registry reload) serialize on _load_lock, build the new snapshot
+    off the read path and swap it in with a single assignment. Derived
+    structures (the area matcher and the Area x Year cube) are therefore
+    always consistent with the frame they were built from.
+
+    The frame is kept ordered by (Area, Year) with a categorical Area, and
+    area_index maps every area to its row range, so per-query filtering is
+    a slice lookup instead of a mask over every row.
+
+    With DATASET_SHARED_MEMORY enabled the frame itself is a read-only
+    memory map shared by all worker processes on the host.
+
+    Uploads are published to a file-based DatasetRegistry. Every worker
+    checks the registry (throttled to one stat() per
+    DATASET_VERSION_CHECK_SECONDS) on get_snapshot() and, when another
+    process has published a newer generation, loads it on a background
+    thread while the current snapshot keeps serving requests.
+
+    merge_with_file() appends (or upserts) a delta file instead: the new
+    snapshot reuses the current one's derived structures and updates them
+    for the delta's (Area, Year) pairs only. Merges hold the registry lock
+    and start from its newest generation, so concurrent merges in different
+    processes cannot drop each other's rows.
     """
 
-    _lock = threading.Lock()
-    _df: Optional[pd.DataFrame] = None
-    _path: Optional[str] = None
+    _load_lock = threading.Lock()
+    _reload_lock = threading.Lock()
+    _snapshot: Optional[DatasetSnapshot] = None
+    _pending_path: Optional[str] = None
+    _versions = itertools.count(1)
+    _registry_token = None
+    _last_registry_check: float = 0.0
+
+    @staticmethod
+    def _fingerprint(path: str) -> Optional[str]:
+        """Hash `path` once per load; missing files are left for the loader to report."""
+        if not Path(path).exists():
+            return None
+        return dataset_fingerprint(path, settings.DATASET_KEEP_EXTRA_COLUMNS)
+
+    @staticmethod
+    def _load(
+        path: str,
+        progress: Optional[ProgressCallback] = None,
+        fingerprint: Optional[str] = None,
+    ) -> pd.DataFrame:
+        cache_dir = settings.DATASET_CACHE_DIR or None
+        keep_extra = settings.DATASET_KEEP_EXTRA_COLUMNS
+        if not settings.DATASET_SHARED_MEMORY:
+            return load_dataset_from_path(
+                path,
+                cache_dir=cache_dir,
+                keep_extra_columns=keep_extra,
+                progress=progress,
+                fingerprint=fingerprint,
+            )
+
+        # Shared mode: the first worker publishes a memory-mapped snapshot,
+        # every worker (including that one) maps it read-only.
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Dataset file not found at: {path}")
+        fingerprint = fingerprint or dataset_fingerprint(path, keep_extra)
+        shared_path = Path(settings.DATASET_SHARED_DIR) / fingerprint
+        if not (shared_path / "meta.json").exists():
+            df = load_dataset_from_path(
+                path,
+                cache_dir=cache_dir,
+                keep_extra_columns=keep_extra,
+                progress=progress,
+                fingerprint=fingerprint,
+            )
+            df = sort_by_area_year(df)
+            write_shared_frame(df, shared_path)
+        return open_shared_frame(shared_path)
+
+    @classmethod
+    def _build_snapshot(
+        cls,
+        df: pd.DataFrame,
+        path: str,
+        generation: Optional[int] = None,
+        fingerprint: Optional[str] = None,
+    ) -> DatasetSnapshot:
+        df = sort_by_area_year(df)  # no-op for frames already ordered (shared mode)
+        return DatasetSnapshot(
+            df=df,
+            path=path,
+            version=next(cls._versions),
+            fingerprint=fingerprint or dataset_fingerprint(path, settings.DATASET_KEEP_EXTRA_COLUMNS),
+            matcher=AreaMatcher(df["Area"].dropna().unique().tolist()),
+            cube=build_area_year_cube(df),
+            area_index=build_area_index(df),
+            generation=generation,
+        )
+
+    @staticmethod
+    def _registry() -> DatasetRegistry:
+        return DatasetRegistry(settings.DATASET_REGISTRY_PATH)
+
+    @classmethod
+    def get_snapshot(cls) -> DatasetSnapshot:
+        snapshot = cls._snapshot
+        if snapshot is not None:
+            cls._check_registry()
+            return snapshot
+
+        with cls._load_lock:
+            if cls._snapshot is None:
+                registry = cls._registry()
+                cls._registry_token = registry.stat_token()
+                cls._last_registry_check = time.monotonic()
+                entry = registry.read()
+                if entry and Path(entry["path"]).exists():
+                    cls._pending_path = entry["path"]
+                    cls._snapshot = cls._snapshot_from_entry(entry)
+                else:
+                    path = cls._pending_path = settings.DEFAULT_DATASET_PATH
+                    fingerprint = cls._fingerprint(path)
+                    df = cls._load(path, fingerprint=fingerprint)
+                    cls._snapshot = cls._build_snapshot(df, path, fingerprint=fingerprint)
+            return cls._snapshot
+
+    @classmethod
+    def _snapshot_from_entry(cls, entry: Dict[str, Any]) -> DatasetSnapshot:
+        # Published entries carry their fingerprint, so it is not rehashed here
+        fingerprint = entry.get("fingerprint")
+        df = cls._load(entry["path"], fingerprint=fingerprint)
+        return cls._build_snapshot(df, entry["path"], entry["generation"], fingerprint)
+
+    @classmethod
+    def _check_registry(cls) -> None:
+        """Start a background reload if another worker published a new dataset."""
+        now = time.monotonic()
+        if now - cls._last_registry_check < settings.DATASET_VERSION_CHECK_SECONDS:
+            return
+        if not cls._reload_lock.acquire(blocking=False):
+            return  # a check or reload is already in progress
+
+        started = False
+        try:
+            cls._last_registry_check = now
+            registry = cls._registry()
+            token = registry.stat_token()
+            if token is None or token == cls._registry_token:
+                return
+
+            entry = registry.read()
+            current = cls._snapshot
+            if not entry or (current is not None and entry["generation"] == current.generation):
+                cls._registry_token = token
+                return
+
+            # The token is recorded only once the reload succeeds, so a failed
+            # reload is retried on the next check.
+            threading.Thread(
+                target=cls._reload_from_registry,
+                args=(entry, token),
+                name="dataset-reload",
+                daemon=True,
+            ).start()
+            started = True
+        finally:
+            if not started:
+                cls._reload_lock.release()
+
+    @classmethod
+    def _reload_from_registry(cls, entry: Dict[str, Any], token: Any = None) -> None:
+        try:
+            with cls._load_lock:
+                current = cls._snapshot
+                # A local replace_with_file may have activated something newer
+                stale = (
+                    current is not None
+                    and current.generation is not None
+                    and entry["generation"] <= current.generation
+                )
+                if not stale:
+                    cls._snapshot = cls._snapshot_from_entry(entry)
+                cls._registry_token = token
+        except Exception:
+            logger.exception(
+                "Failed to load published dataset %s; retrying on the next check",
+                entry.get("path"),
+            )
+        finally:
+            cls._reload_lock.release()
 
     @classmethod
     def get_dataframe(cls) -> pd.DataFrame:
-        with cls._lock:
-            if cls._df is None:
-                cls._path = settings.DEFAULT_DATASET_PATH
-                cls._df = load_dataset_from_path(cls._path)
-            return cls._df
+        return cls.get_snapshot().df
+
+    @classmethod
+    def get_area_matcher(cls) -> AreaMatcher:
+        return cls.get_snapshot().matcher
+
+    @classmethod
+    def get_area_year_cube(cls) -> pd.DataFrame:
+        return cls.get_snapshot().cube
+
+    @classmethod
+    def replace_with_file(
+        cls, file_path: str, progress: Optional[ProgressCallback] = None
+    ) -> pd.DataFrame:
+        """
+        Load `file_path`, build its snapshot and activate it in one swap;
+        requests keep using the previous snapshot until then.
+        """
+        with cls._load_lock:
+            fingerprint = cls._fingerprint(file_path)
+            df = cls._load(file_path, progress, fingerprint)
+            report_progress(progress, "indexing", rows_loaded=int(df.shape[0]))
+            snapshot = cls._build_snapshot(df, file_path, fingerprint=fingerprint)
+            report_progress(progress, "activating")
+            cls._activate(snapshot)
+            return snapshot.df
+
+    @classmethod
+    def _activate(cls, snapshot: DatasetSnapshot, registry: Optional[DatasetRegistry] = None) -> None:
+        """
+        Publish the snapshot's file to the registry and swap it in (under
+        _load_lock). A merged file superseded by this publish is deleted.
+        """
+        registry = registry or cls._registry()
+        try:
+            with registry.lock():
+                previous = registry.read()
+                entry = registry.publish(snapshot.path, fingerprint=snapshot.fingerprint)
+        except OSError:
+            logger.exception("Could not publish dataset %s to other workers", snapshot.path)
+        else:
+            snapshot = replace(snapshot, generation=entry["generation"])
+            cls._registry_token = registry.stat_token()
+            if previous and previous["path"] != snapshot.path:
+                cls._remove_merged_file(previous["path"])
+        cls._snapshot = snapshot
+
+    @staticmethod
+    def _remove_merged_file(path: str) -> None:
+        # Workers still on that generation keep their in-memory copy; uploads
+        # and the default dataset are never removed
+        if not path.endswith(MERGED_SUFFIX):
+            return
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning("Could not remove superseded dataset %s: %s", path, e)
 
     @classmethod
-    def replace_with_file(cls, file_path: str) -> pd.DataFrame:
-        with cls._lock:
-            df = load_dataset_from_path(file_path)
-            cls._df = df
-            cls._path = file_path
-            return df
+    def merge_with_file(
+        cls, file_path: str, upsert: bool = False, progress: Optional[ProgressCallback] = None
+    ) -> pd.DataFrame:
+        """
+        Merge the rows of `file_path` into the active dataset and activate
+        the result. With `upsert`, rows of the active dataset whose (Area,
+        Year) appears in the file are replaced; otherwise rows are appended.
+
+        Only the delta file is parsed. The frame is merged in order, the cube
+        is recomputed for the touched (Area, Year) pairs and the matcher only
+        learns the new areas. The merged frame is written next to the delta
+        as Parquet and published, so other workers load it from there.
+
+        The whole merge holds the registry lock and first catches up with
+        the newest published generation, so a merge never starts from a
+        stale snapshot and two merges cannot publish over each other.
+        """
+        keep_extra = settings.DATASET_KEEP_EXTRA_COLUMNS
+        mode = "upsert" if upsert else "append"
+        delta = load_dataset_from_path(file_path, keep_extra_columns=keep_extra, progress=progress)
+
+        cls.get_snapshot()  # make sure there is an active dataset to merge into
+        registry = cls._registry()
+        with cls._load_lock, registry.lock():
+            current = cls._snapshot
+            entry = registry.read()
+            if entry and entry["generation"] != current.generation:
+                logger.info("Loading dataset generation %s before merging", entry["generation"])
+                current = cls._snapshot = cls._snapshot_from_entry(entry)
+                cls._registry_token = registry.stat_token()
+
+            report_progress(progress, "merging", rows_parsed=int(delta.shape[0]))
+            df = merge_by_area_year(current.df, delta, upsert=upsert)
+            fingerprint = merged_fingerprint(current.fingerprint, file_path, mode, keep_extra)
+            merged_path = Path(file_path).with_suffix(MERGED_SUFFIX)
+            df.to_parquet(merged_path)
+            if settings.DATASET_SHARED_MEMORY:
+                shared_path = Path(settings.DATASET_SHARED_DIR) / fingerprint
+                write_shared_frame(df, shared_path)
+                df = open_shared_frame(shared_path)
+
+            report_progress(progress, "indexing", rows_loaded=int(df.shape[0]))
+            area_index = build_area_index(df)
+            snapshot = DatasetSnapshot(
+                df=df,
+                path=str(merged_path),
+                version=next(cls._versions),
+                fingerprint=fingerprint,
+                matcher=current.matcher.with_areas(delta["Area"].astype(str).unique()),
+                cube=update_area_year_cube(current.cube, df, delta),
+                area_index=area_index,
+            )
+            logger.info(
+                "Merged %d rows from %s (%s): %d -> %d rows",
+                len(delta),
+                file_path,
+                mode,
+                len(current.df),
+                len(df),
+            )
+
+            report_progress(progress, "activating")
+            cls._activate(snapshot, registry)
+            return snapshot.df
 
     @classmethod
     def get_current_path(cls) -> Optional[str]:
-        with cls._lock:
-            return cls._path
+        snapshot = cls._snapshot
+        return snapshot.path if snapshot is not None else cls._pending_path
+
+    @classmethod
+    def get_version(cls) -> int:
+        snapshot = cls._snapshot
+        return snapshot.version if snapshot is not None else 0
+
+    @classmethod
+    def get_generation(cls) -> Optional[int]:
+        """Registry generation of the active dataset (None for the default file)."""
+        snapshot = cls._snapshot
+        return snapshot.generation if snapshot is not None else None
@@ -0,0 +1,89 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishes are not serialized across processes
+    fcntl = None
+
+
+class DatasetRegistry:
+    """
+    File-based record of the active dataset shared by all worker processes.
+
+    The registry is a small JSON document {"generation", "path", "updated_at",
+    "fingerprint"} replaced atomically on every publish. Workers poll its stat() token,
+    which costs one syscall, and only re-read the JSON when it changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock_depth = 0
+
+    def stat_token(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        # Every publish is an os.replace, so the inode changes too
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self.path.open(encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or "generation" not in entry or "path" not in entry:
+            return None
+        return entry
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Exclusive cross-process lock on the registry. Hold it around a
+        read -> build -> publish sequence so no other publish can land in
+        between; publish() called inside it reuses the held lock.
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with lock_path.open("a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def publish(self, dataset_path: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Record `dataset_path` as active under the next generation number.
+        Extra `fields` (e.g. the dataset fingerprint) are stored in the entry.
+        """
+        with self.lock():
+            current = self.read()
+            entry = {
+                **fields,
+                "generation": (current["generation"] if current else 0) + 1,
+                "path": str(dataset_path),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        return entry
@@ -0,0 +1,102 @@
+import csv
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List
+
+from django.db.models import F, QuerySet
+from rest_framework.utils.encoders import JSONEncoder
+
+from analytics.utils.payload_codec import decode_payload
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+EXPORT_FIELDS = [
+    "id",
+    "user_id",
+    "username",
+    "query",
+    "summary",
+    "intent_type",
+    "areas",
+    "time_window",
+    "created_at",
+]
+
+# Emit roughly this many bytes per response chunk
+_CHUNK_BYTES = 64 * 1024
+
+
+def export_rows(
+    qs: QuerySet, include_full_response: bool = False, chunk_size: int = 2000
+) -> Iterator[Dict[str, Any]]:
+    """Stream history rows as dicts, newest first, without loading the table."""
+    fields = [f for f in EXPORT_FIELDS if f != "username"]
+    expressions = {"username": F("user__username")}
+    if include_full_response:
+        fields.append("full_response")
+        expressions["payload_codec"] = F("payload__codec")
+        expressions["payload_data"] = F("payload__data")
+
+    rows = qs.order_by("-created_at", "-id").values(*fields, **expressions)
+    for row in rows.iterator(chunk_size=chunk_size):
+        if include_full_response:
+            codec = row.pop("payload_codec")
+            data = row.pop("payload_data")
+            if data is not None:
+                row["full_response"] = decode_payload(codec, data)
+        yield row
+
+
+def jsonl_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(rows: Iterable[Dict[str, Any]], include_full_response: bool = False) -> Iterator[str]:
+    columns: List[str] = EXPORT_FIELDS + (["full_response"] if include_full_response else [])
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if column == "full_response" and value is not None:
+                value = json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+            elif column == "created_at" and value is not None:
+                value = value.isoformat()
+            values.append("" if value is None else value)
+        yield writer.writerow(values)
+
+
+def encode_chunks(lines: Iterable[str], gzip: bool = False) -> Iterator[bytes]:
+    """Batch text lines into ~64KB UTF-8 chunks, optionally gzip-compressed."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+    buffer: List[str] = []
+    size = 0
+
+    def flush() -> bytes:
+        data = "".join(buffer).encode("utf-8")
+        buffer.clear()
+        return compressor.compress(data) if compressor else data
+
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= _CHUNK_BYTES:
+            size = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,231 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from analytics.models import ResponsePayload, SearchHistory
+
+logger = logging.getLogger(__name__)
+
+WRITER_MODES = ("sync", "background")
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """
+    Writes SearchHistory rows (and their ResponsePayloads) off the request path.
+
+    In "background" mode save() only enqueues the record; a daemon thread
+    compresses the payloads and inserts them with bulk_create whenever
+    `batch_size` records are waiting or `flush_interval` seconds have passed
+    since the first one was queued. close() (registered with atexit) drains
+    the queue before the process exits. When the queue is full, save()
+    writes synchronously instead of dropping the record.
+
+    In "sync" mode save() inserts the row before returning, which is what
+    tests and one-off scripts want.
+    """
+
+    def __init__(
+        self,
+        mode: str = "background",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+    ):
+        if mode not in WRITER_MODES:
+            raise ValueError(f"Unknown history writer mode: {mode}")
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+
+    def save(self, full_response: Dict[str, Any], **fields: Any) -> None:
+        self.save_many([(full_response, fields)])
+
+    def save_many(self, records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        """
+        Save (full_response, SearchHistory fields) pairs; sync mode inserts
+        them as one batch. Rows without a created_at are dated now, when
+        they are queued, rather than when the batch is flushed.
+        """
+        now = timezone.now()
+        batch = [
+            {"full_response": full_response, "fields": {"created_at": now, **fields}}
+            for full_response, fields in records
+        ]
+        if not batch:
+            return
+        if self.mode == "sync":
+            self._write_batch(batch)
+            return
+
+        self._ensure_thread()
+        overflow = []
+        for record in batch:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                overflow.append(record)
+        if overflow:
+            logger.warning("History queue is full; writing %d rows synchronously", len(overflow))
+            self._write_batch(overflow)
+
+    def insert(self, records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[int]:
+        """
+        Insert (full_response, fields) pairs now, whatever the mode, and
+        return the new row ids so complete() can fill them in later.
+        """
+        now = timezone.now()
+        rows = self._insert_batch(
+            [
+                {"full_response": full_response, "fields": {"created_at": now, **fields}}
+                for full_response, fields in records
+            ]
+        )
+        self.written += len(rows)
+        return [row.pk for row in rows]
+
+    def complete(
+        self, ids: List[int], records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        """Replace the payload and fields of rows created by insert(), pairwise."""
+        payloads: Dict[str, ResponsePayload] = {}
+        updates = []
+        for pk, (full_response, fields) in zip(ids, records):
+            payload = ResponsePayload.build(full_response)
+            payload = payloads.setdefault(payload.digest, payload)
+            updates.append((pk, payload, fields))
+
+        with transaction.atomic():
+            ResponsePayload.objects.bulk_create(payloads.values(), ignore_conflicts=True)
+            for pk, payload, fields in updates:
+                SearchHistory.objects.filter(pk=pk).update(payload=payload, **fields)
+
+    def flush(self) -> int:
+        """Write everything queued so far on the calling thread."""
+        batch = []
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                batch.append(record)
+        for start in range(0, len(batch), self.batch_size):
+            self._write_batch(batch[start : start + self.batch_size])
+        return len(batch)
+
+    def close(self, timeout: float = 10.0) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                # Forked worker: the parent's thread and queued records stay in the parent
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._pid = pid
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            stop = record is _STOP
+            if record is not None and not stop:
+                batch.append(record)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (stop or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                close_old_connections()
+                try:
+                    self._write_batch(batch)
+                finally:
+                    connections.close_all()
+                batch = []
+                deadline = None
+
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self._insert_batch(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %d history rows", len(batch))
+            if self.mode == "sync":
+                raise
+            return
+        self.written += len(batch)
+
+    def _insert_batch(self, batch: List[Dict[str, Any]]) -> List[SearchHistory]:
+        payloads: Dict[str, ResponsePayload] = {}
+        rows = []
+        for record in batch:
+            payload = ResponsePayload.build(record["full_response"])
+            payload = payloads.setdefault(payload.digest, payload)
+            rows.append(SearchHistory(payload=payload, **record["fields"]))
+
+        with transaction.atomic():
+            # Payloads are content-addressed: existing digests are already stored
+            ResponsePayload.objects.bulk_create(payloads.values(), ignore_conflicts=True)
+            return SearchHistory.objects.bulk_create(rows)
+
+
+_history_writer: Optional[HistoryWriter] = None
+_history_writer_lock = threading.Lock()
+
+
+def get_history_writer() -> HistoryWriter:
+    global _history_writer
+    if _history_writer is None:
+        with _history_writer_lock:
+            if _history_writer is None:
+                _history_writer = HistoryWriter(
+                    mode=settings.HISTORY_WRITER_MODE,
+                    batch_size=settings.HISTORY_WRITER_BATCH_SIZE,
+                    flush_interval=settings.HISTORY_WRITER_FLUSH_SECONDS,
+                    max_queue=settings.HISTORY_WRITER_MAX_QUEUE,
+                )
+                atexit.register(_history_writer.close)
+    return _history_writer
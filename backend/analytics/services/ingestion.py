@@ -0,0 +1,76 @@
+import logging
+import os
+from typing import Any, Dict
+
+from django.conf import settings
+
+from .data_repository import DataRepository
+from .jobs import JobStore, run_in_background
+
+logger = logging.getLogger(__name__)
+
+ingestion_jobs = JobStore("ingest-job")
+
+# replace: the file becomes the dataset; append: its rows are added to the
+# active dataset; upsert: its rows replace the active rows of the same (Area, Year)
+INGEST_MODES = ("replace", "append", "upsert")
+
+
+def start_ingestion_job(
+    user_id: int, file_path: str, file_name: str, mode: str = "replace"
+) -> Dict[str, Any]:
+    """
+    Load an uploaded dataset on the background pool and activate it.
+
+    The job record moves from "pending" to "running" (with "stage":
+    reading -> validating -> [merging ->] indexing -> activating, plus row
+    counts as they become known) and ends as "done" (rows_loaded, columns)
+    or "failed" (error). A failed upload is deleted; the active dataset is
+    only replaced once the new snapshot is fully built.
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingestion mode: {mode}")
+    job = ingestion_jobs.create(
+        user_id=user_id,
+        file_name=file_name,
+        mode=mode,
+        stage="queued",
+        rows_parsed=None,
+        rows_loaded=None,
+    )
+    run_in_background("ingest", settings.INGEST_WORKERS, _ingest, job["id"], file_path, mode)
+    return job
+
+
+def _ingest(job_id: str, file_path: str, mode: str) -> None:
+    def progress(stage: str, **info: Any) -> None:
+        ingestion_jobs.update(job_id, status="running", stage=stage, **info)
+
+    try:
+        if mode == "replace":
+            df = DataRepository.replace_with_file(file_path, progress=progress)
+        else:
+            df = DataRepository.merge_with_file(
+                file_path, upsert=mode == "upsert", progress=progress
+            )
+    except Exception as e:
+        logger.warning("Dataset ingestion %s failed: %s", job_id, e)
+        ingestion_jobs.update(
+            job_id,
+            status="failed",
+            stage="failed",
+            error=f"Failed to load uploaded dataset: {e}",
+        )
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        return
+
+    ingestion_jobs.update(
+        job_id,
+        status="done",
+        stage="done",
+        rows_loaded=int(df.shape[0]),
+        columns=[str(c) for c in df.columns],
+    )
@@ -0,0 +1,78 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+            _executors[name] = executor
+        return executor
+
+
+def run_in_background(name: str, max_workers: int, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    """
+    Run `fn` on the named thread pool. The worker thread's DB connections
+    are closed afterwards, like Django does at the end of a request.
+    """
+
+    def _run():
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+            raise
+        finally:
+            connections.close_all()
+
+    return _executor(name, max_workers).submit(_run)
+
+
+class JobStore:
+    """
+    Status records for background jobs, kept in a Django cache
+    (settings.JOB_CACHE_ALIAS, by default the file-based "jobs" cache) so
+    any worker process can answer status polls. A local-memory alias would
+    only let the worker that started the job see it.
+    """
+
+    def __init__(self, prefix: str, ttl_seconds: Optional[float] = None):
+        self.prefix = prefix
+        self.ttl_seconds = settings.JOB_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+
+    @property
+    def _cache(self):
+        return caches[settings.JOB_CACHE_ALIAS]
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    def create(self, **fields: Any) -> Dict[str, Any]:
+        job = {"id": uuid.uuid4().hex, "status": "pending", **fields}
+        self._cache.set(self._key(job["id"]), job, timeout=self.ttl_seconds)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(self._key(job_id))
+
+    def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        self._cache.set(self._key(job_id), job, timeout=self.ttl_seconds)
+        return job
@@ -0,0 +1,120 @@
+import bisect
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+
+from analytics.utils.timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers cached hits (~ms) up to LLM-bound requests
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format sense."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process histograms keyed by metric name and labels.
+
+    Each worker process keeps its own registry, so a scraper sees the
+    worker that answered; aggregate across instances in Prometheus.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._help: Dict[str, str] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in key
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+registry = MetricsRegistry()
+registry.describe("analyze_request_seconds", "End-to-end /api/analyze/ handler time.")
+registry.describe("analyze_stage_seconds", "Time spent in each /api/analyze/ stage.")
+registry.describe("analyze_batch_request_seconds", "End-to-end /api/analyze/batch/ handler time.")
+registry.describe("analyze_batch_stage_seconds", "Time spent in each /api/analyze/batch/ stage.")
+
+
+def record_request_timing(endpoint: str, timer: StageTimer, status_code: int) -> None:
+    """Log the request's stage timings as one JSON line and feed the histograms."""
+    total = timer.total
+    logger.info(
+        json.dumps(
+            {
+                "event": "request_timing",
+                "endpoint": endpoint,
+                "status": status_code,
+                "total_ms": round(total * 1000, 2),
+                "stages_ms": {name: round(sec * 1000, 2) for name, sec in timer.stages.items()},
+                **timer.tags,
+            },
+            default=str,
+        )
+    )
+
+    if not settings.METRICS_ENABLED:
+        return
+    registry.observe(f"{endpoint}_request_seconds", total, status=str(status_code))
+    for name, seconds in timer.stages.items():
+        registry.observe(f"{endpoint}_stage_seconds", seconds, stage=name)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ResultCache:
+    """
+    Cache of computed /api/analyze/ results.
+
+    Entries live in an in-process LRU bounded by `max_entries` and expiring
+    after `ttl_seconds`. When `backend_alias` names a Django cache
+    (settings.CACHES), it is used as a second, shared tier so workers can
+    reuse each other's results.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600, backend_alias: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend_alias = backend_alias
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or bool(self.backend_alias)
+
+    @staticmethod
+    def make_key(intent: Dict[str, Any], dataset_key: str, **options: Any) -> str:
+        normalized = {
+            "intent_type": intent.get("intent_type", ""),
+            "areas": sorted(intent.get("areas") or []),
+            "years": sorted(intent.get("years") or []),
+            "last_n_years": intent.get("last_n_years") or 0,
+            "dataset": dataset_key,
+            "options": options,
+        }
+        raw = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return "analyze:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_local(key)
+        if value is None and self.backend_alias:
+            value = caches[self.backend_alias].get(key)
+            if value is not None:
+                self._set_local(key, value)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._set_local(key, value)
+        if self.backend_alias:
+            caches[self.backend_alias].set(key, value, timeout=self.ttl_seconds or None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "backend": self.backend_alias or None,
+            }
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    max_entries=settings.ANALYZE_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.ANALYZE_CACHE_TTL_SECONDS,
+                    backend_alias=settings.ANALYZE_CACHE_BACKEND,
+                )
+    return _result_cache
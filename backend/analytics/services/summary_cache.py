@@ -0,0 +1,88 @@
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from analytics.models import SummaryCacheEntry
+
+# Only refresh last_used_at this often, so cache hits rarely write
+_TOUCH_INTERVAL = timedelta(seconds=60)
+
+
+def make_summary_key(
+    intent: Dict[str, Any], insights: Dict[str, Any], model: str, prompt_version: int
+) -> str:
+    """Canonical hash of everything that determines an LLM summary."""
+    payload = {
+        "intent": intent,
+        "insights": insights,
+        "model": model,
+        "prompt_version": prompt_version,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Database-backed LRU cache of LLM summaries.
+
+    Entries expire after `ttl_seconds` (0 = never) and the table is trimmed
+    to the `max_entries` most recently used rows on every insert. Database
+    errors are swallowed: the cache must never break summarization.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = (
+            settings.SUMMARY_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.ttl_seconds = (
+            settings.SUMMARY_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            entry = SummaryCacheEntry.objects.filter(key=key).first()
+            if entry is None:
+                return None
+
+            now = timezone.now()
+            if self.ttl_seconds and entry.created_at < now - timedelta(seconds=self.ttl_seconds):
+                entry.delete()
+                return None
+
+            if entry.last_used_at < now - _TOUCH_INTERVAL:
+                SummaryCacheEntry.objects.filter(key=key).update(last_used_at=now)
+            return entry.summary
+        except DatabaseError:
+            return None
+
+    def set(self, key: str, model: str, summary: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            SummaryCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={"model": model, "summary": summary, "last_used_at": timezone.now()},
+            )
+            self._trim()
+        except DatabaseError:
+            pass
+
+    def _trim(self) -> None:
+        stale = SummaryCacheEntry.objects.order_by("-last_used_at").values_list(
+            "key", flat=True
+        )[self.max_entries:]
+        stale_keys = list(stale)
+        if stale_keys:
+            SummaryCacheEntry.objects.filter(key__in=stale_keys).delete()
@@ -0,0 +1,70 @@
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+
+from .ai_summarizer import AISummarizer
+from .jobs import JobStore, run_in_background
+
+logger = logging.getLogger(__name__)
+
+summary_jobs = JobStore("summary-job")
+
+
+def start_summary_job(
+    user_id: int,
+    query: str,
+    intent: Dict[str, Any],
+    insights: Dict[str, Any],
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Generate a summary on the background pool. The job record moves from
+    "pending" to "done" (with "summary") or "failed"; `on_complete` then
+    runs on the same background thread with the summary text.
+    """
+    job = summary_jobs.create(user_id=user_id, summary=None)
+    run_in_background(
+        "summary",
+        settings.SUMMARY_WORKERS,
+        _generate_summary,
+        job["id"],
+        query,
+        intent,
+        insights,
+        on_complete,
+    )
+    return job
+
+
+def _generate_summary(job_id, query, intent, insights, on_complete) -> None:
+    try:
+        summary = AISummarizer().summarize(query, intent, insights)
+    except Exception as e:
+        summary_jobs.update(job_id, status="failed", error=str(e))
+        raise
+
+    summary_jobs.update(job_id, status="done", summary=summary)
+    if on_complete is not None:
+        on_complete(summary)
+
+
+def wait_for_summary_job(
+    job_id: str, timeout: float, poll_interval: float = 0.25
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Poll a job until it leaves "pending" or `timeout` expires. Yields None
+    on every pending poll (so callers can emit keep-alives) and finally the
+    finished job record, or None if it is still pending at the deadline.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = summary_jobs.get(job_id)
+        if job is not None and job["status"] != "pending":
+            yield job
+            return
+        if job is None or time.monotonic() >= deadline:
+            return
+        yield None
+        time.sleep(poll_interval)
@@ -0,0 +1,663 @@
+import json
+import logging
+import random
+import re
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts.models import User
+from accounts.views import DeleteUserView
+from benchmarks.synthetic import SOURCE_COLUMNS, generate_dataset, write_dataset
+
+from .models import ResponsePayload, SearchHistory, SummaryCacheEntry
+from .services.ai_summarizer import PROMPT_VERSION, AISummarizer
+from .services.circuit_breaker import CircuitBreaker
+from .services.data_repository import DataRepository
+from .services.history_writer import HistoryWriter
+from .services.summary_cache import SummaryCache, make_summary_key
+from .utils.analytics_core import (
+    analyze_intent,
+    build_area_year_cube,
+    build_table_payload,
+    merge_by_area_year,
+    sort_by_area_year,
+    update_area_year_cube,
+)
+from .utils import data_loader
+from .utils.area_matcher import AreaMatcher
+from .utils.payload_codec import decode_payload, encode_payload
+
+
+def random_frame(rng, rows, areas, years):
+    """Raw dataset rows with whole-number measures (so means compare exactly) and some gaps."""
+    frame = pd.DataFrame(
+        {
+            "Year": rng.choice(list(years), rows),
+            "Area": rng.choice(list(areas), rows),
+            "Price": rng.integers(1000, 9000, rows).astype("float64"),
+            "Demand": rng.integers(0, 500, rows).astype("float64"),
+            "Size": rng.integers(300, 3000, rows).astype("float64"),
+        }
+    )
+    frame.loc[rng.random(rows) < 0.1, "Price"] = np.nan
+    frame.loc[rng.random(rows) < 0.1, "Demand"] = np.nan
+    return frame
+
+
+def random_intent(rng, areas, years):
+    intent = {"intent_type": "single", "areas": list(rng.choice(list(areas), rng.integers(1, 4)))}
+    kind = rng.integers(0, 3)
+    if kind == 1:
+        intent["years"] = sorted(int(y) for y in rng.choice(list(years), 2))
+    elif kind == 2:
+        intent["last_n_years"] = int(rng.integers(1, 6))
+    return intent
+
+
+def analysis_json(analysis):
+    # NaN-safe comparison of charts, table and insights
+    return json.dumps({k: v for k, v in analysis.items() if k != "filtered_df"}, sort_keys=True)
+
+
+class StubLLMClient:
+    """Stands in for the OpenAI client: `chat.completions.create(...)` returns a fixed summary."""
+
+    def __init__(self, text="Stub summary."):
+        self.text = text
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = SimpleNamespace(content=f"  {self.text}  ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def iterrows_table(frame):
+    """The per-row table serialization build_table_payload replaced."""
+    rows = []
+    for _, row in frame.iterrows():
+        rows.append(
+            {
+                "Year": int(row["Year"]),
+                "Area": str(row["Area"]),
+                "Price": float(row["Price"]) if not np.isnan(row["Price"]) else None,
+                "Demand": float(row["Demand"]) if not np.isnan(row["Demand"]) else None,
+                "Size": float(row["Size"]) if not np.isnan(row["Size"]) else None,
+            }
+        )
+    return rows
+
+
+def naive_area_scan(text, areas):
+    """The per-area regex scan AreaMatcher replaced (one re.search per locality)."""
+    lowercase = text.lower()
+    matched = []
+    for area in sorted(areas, key=len, reverse=True):
+        if re.search(r"\b" + re.escape(area.lower()) + r"\b", lowercase) and area not in matched:
+            matched.append(area)
+    return matched
+
+
+class AreaMatcherTests(SimpleTestCase):
+    AREAS = ["Wakad", "Aundh", "Baner", "Baner Road", "Hinjewadi Phase 1", "Pimple Saudagar"]
+
+    def test_matches_same_areas_as_naive_scan(self):
+        rng = random.Random(7)
+        words = ["wakad", "aundh", "kothrud", "hadapsar", "viman", "nagar", "kharadi", "undri"]
+        rng.shuffle(words)
+        # Names share no words; overlapping names are covered separately (longest wins)
+        areas = [" ".join(words[i : i + size]).title() for i, size in zip((0, 1, 3, 4, 6), (1, 2, 1, 2, 1))]
+        matcher = AreaMatcher(areas)
+        filler = ["compare", "and", "in", "price", "of", "2021", "vs", "growth,", "demand!"]
+        hits = 0
+        for _ in range(200):
+            tokens = rng.sample(filler, 3) + [rng.choice(areas + filler) for _ in range(3)]
+            rng.shuffle(tokens)
+            query = " ".join(t.upper() if rng.random() < 0.2 else t for t in tokens)
+            matched = matcher.match(query)
+            self.assertEqual(sorted(matched), sorted(naive_area_scan(query, areas)), query)
+            hits += bool(matched)
+        self.assertGreater(hits, 100)
+
+    def test_returns_areas_in_order_of_appearance_without_duplicates(self):
+        matcher = AreaMatcher(self.AREAS)
+        self.assertEqual(
+            matcher.match("Compare aundh, WAKAD and Aundh in 2022"), ["Aundh", "Wakad"]
+        )
+
+    def test_longer_name_wins_over_its_prefix(self):
+        matcher = AreaMatcher(self.AREAS)
+        self.assertEqual(matcher.match("Analyze Baner Road"), ["Baner Road"])
+        self.assertEqual(matcher.match("Analyze Baner and Baner Road"), ["Baner", "Baner Road"])
+
+    def test_requires_word_boundaries(self):
+        matcher = AreaMatcher(self.AREAS)
+        self.assertEqual(matcher.match("Analyze Wakadi and Bananer"), [])
+        self.assertEqual(matcher.match("hinjewadi phase 1 demand"), ["Hinjewadi Phase 1"])
+
+    def test_add_areas_reports_new_names_only(self):
+        matcher = AreaMatcher(["Wakad"])
+        self.assertEqual(matcher.add_areas(["wakad", "Aundh", None, " "]), ["Aundh"])
+        self.assertEqual(len(matcher), 2)
+        self.assertEqual(matcher.match("Aundh vs Wakad"), ["Aundh", "Wakad"])
+
+
+class AreaYearCubeTests(SimpleTestCase):
+    def test_cube_matches_groupby_over_raw_rows(self):
+        rng = np.random.default_rng(2)
+        df = random_frame(rng, 400, ["Wakad", "Aundh", "Baner"], range(2015, 2022))
+        cube = build_area_year_cube(df)
+        expected = df.groupby(["Area", "Year"])[["Price", "Demand", "Size"]].agg(["sum", "count", "mean"])
+        for (measure, stat), column in expected.items():
+            np.testing.assert_allclose(cube[f"{measure}_{stat}"].to_numpy(), column.to_numpy())
+
+    def test_analysis_with_cube_equals_per_query_groupby(self):
+        rng = np.random.default_rng(3)
+        areas, years = ["Wakad", "Aundh", "Baner", "Kothrud"], range(2012, 2024)
+        df = random_frame(rng, 600, areas[:3], years)
+        cube = build_area_year_cube(df)
+        for _ in range(100):
+            intent = random_intent(rng, areas, years)
+            self.assertEqual(
+                analysis_json(analyze_intent(df, intent, cube=cube)),
+                analysis_json(analyze_intent(df, intent)),
+                intent,
+            )
+
+    def test_large_last_n_years_covers_all_years(self):
+        rng = np.random.default_rng(5)
+        df = random_frame(rng, 200, ["Wakad", "Aundh"], range(2015, 2022))
+        df["Year"] = df["Year"].astype("int16")
+        cube = build_area_year_cube(df)
+        intent = {"intent_type": "single", "areas": ["Wakad"], "last_n_years": 40000}
+        with np.errstate(over="raise"):
+            with_cube = analyze_intent(df, intent, cube=cube)
+            without = analyze_intent(df, intent)
+        self.assertEqual(analysis_json(with_cube), analysis_json(without))
+        self.assertEqual(with_cube["insights"]["years"], list(range(2015, 2022)))
+
+
+class TablePayloadTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        frame = random_frame(rng, 300, ["Wakad", "Aundh", "Baner"], range(2015, 2022))
+        frame.loc[rng.random(len(frame)) < 0.1, "Size"] = np.nan
+        frame["Area"] = frame["Area"].astype("category")
+        frame["Year"] = frame["Year"].astype("int16")
+        frame["Price"] = frame["Price"].astype("float32")
+        self.frame = frame.sort_values(["Area", "Year"])
+
+    def test_rows_format_matches_iterrows(self):
+        payload = build_table_payload(self.frame)
+        self.assertEqual(payload["columns"], ["Year", "Area", "Price", "Demand", "Size"])
+        self.assertEqual(json.dumps(payload["rows"]), json.dumps(iterrows_table(self.frame)))
+
+    def test_columns_format_is_transposed_rows(self):
+        payload = build_table_payload(self.frame, table_format="columns")
+        expected = iterrows_table(self.frame)
+        self.assertEqual(
+            payload["data"], {c: [row[c] for row in expected] for c in payload["columns"]}
+        )
+
+    def test_empty_frame(self):
+        self.assertEqual(build_table_payload(self.frame.iloc[:0]), {"columns": [], "rows": []})
+
+
+class RegistryReloadTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(DataRepository, _snapshot=None, _registry_token=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_reload_is_retried(self):
+        entry = {"path": "missing.parquet", "generation": 3}
+        with mock.patch.object(DataRepository, "_snapshot_from_entry", side_effect=OSError("gone")):
+            DataRepository._reload_lock.acquire()
+            with self.assertLogs("analytics.services.data_repository", "ERROR"):
+                DataRepository._reload_from_registry(entry, (1, 2, 3))
+        self.assertIsNone(DataRepository._registry_token)
+        self.assertFalse(DataRepository._reload_lock.locked())
+
+        snapshot = mock.Mock(generation=3)
+        with mock.patch.object(DataRepository, "_snapshot_from_entry", return_value=snapshot):
+            DataRepository._reload_lock.acquire()
+            DataRepository._reload_from_registry(entry, (1, 2, 3))
+        self.assertIs(DataRepository._snapshot, snapshot)
+        self.assertEqual(DataRepository._registry_token, (1, 2, 3))
+
+
+class SummaryCacheTests(TestCase):
+    INTENT = {"intent_type": "single", "areas": ["Wakad"]}
+    INSIGHTS = {"areas": ["Wakad"], "years": [2020, 2024], "price_growth_pct": {"Wakad": 12.5}}
+
+    def summarizer(self, client, model="stub-model"):
+        return AISummarizer(
+            llm_client=client,
+            model=model,
+            cache=SummaryCache(max_entries=100, ttl_seconds=0),
+            deadline=5,
+            circuit=CircuitBreaker(),
+        )
+
+    def test_injected_client_is_used(self):
+        client = StubLLMClient()
+        summary = self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        self.assertEqual(summary, "Stub summary.")
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(client.calls[0]["model"], "stub-model")
+
+    def test_second_request_is_served_from_the_database(self):
+        client = StubLLMClient()
+        self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        key = make_summary_key(self.INTENT, self.INSIGHTS, "stub-model", PROMPT_VERSION)
+        self.assertEqual(SummaryCacheEntry.objects.get(key=key).summary, "Stub summary.")
+
+        # A new summarizer (e.g. another worker) reuses the persisted summary
+        other = StubLLMClient("Different summary.")
+        summary = self.summarizer(other).summarize("Show Wakad", dict(self.INTENT), dict(self.INSIGHTS))
+        self.assertEqual(summary, "Stub summary.")
+        self.assertEqual(other.calls, [])
+
+    def test_cache_miss_when_model_or_inputs_change(self):
+        client = StubLLMClient()
+        self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        self.summarizer(client, model="other-model").summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        self.summarizer(client).summarize("Analyze Aundh", {**self.INTENT, "areas": ["Aundh"]}, self.INSIGHTS)
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(SummaryCacheEntry.objects.count(), 3)
+
+    def test_key_covers_model_and_prompt_version(self):
+        key = make_summary_key(self.INTENT, self.INSIGHTS, "stub-model", PROMPT_VERSION)
+        reordered = dict(reversed(list(self.INSIGHTS.items())))
+        self.assertEqual(key, make_summary_key(self.INTENT, reordered, "stub-model", PROMPT_VERSION))
+        self.assertNotEqual(key, make_summary_key(self.INTENT, self.INSIGHTS, "other-model", PROMPT_VERSION))
+        self.assertNotEqual(key, make_summary_key(self.INTENT, self.INSIGHTS, "stub-model", PROMPT_VERSION + 1))
+
+    def test_prompt_version_bump_invalidates_cached_summaries(self):
+        client = StubLLMClient()
+        self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        with mock.patch("analytics.services.ai_summarizer.PROMPT_VERSION", PROMPT_VERSION + 1):
+            self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        self.assertEqual(len(client.calls), 2)
+
+    def test_failed_call_falls_back_and_is_not_cached(self):
+        client = StubLLMClient()
+        client.create = mock.Mock(side_effect=RuntimeError("boom"))
+        with self.assertLogs("analytics.services.ai_summarizer", "WARNING"):
+            summary = self.summarizer(client).summarize("Analyze Wakad", self.INTENT, self.INSIGHTS)
+        self.assertTrue(summary.startswith("Analysis for Wakad."))
+        self.assertFalse(SummaryCacheEntry.objects.exists())
+
+
+class HistoryWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("analyst", email="analyst@example.com")
+
+    def test_inserted_rows_are_completed_in_place(self):
+        writer = HistoryWriter(mode="background")
+        fields = {"user_id": self.user.id, "query": "Analyze Wakad"}
+        ids = writer.insert([({"query": "Analyze Wakad", "summary": None}, {**fields, "summary": None})])
+        row = SearchHistory.objects.get(pk=ids[0])
+        self.assertIsNone(row.summary)
+        self.assertIsNone(row.get_full_response()["summary"])
+
+        writer.complete(ids, [({"query": "Analyze Wakad", "summary": "Up."}, {**fields, "summary": "Up."})])
+        row.refresh_from_db()
+        self.assertEqual(row.summary, "Up.")
+        self.assertEqual(row.get_full_response(), {"query": "Analyze Wakad", "summary": "Up."})
+        self.assertEqual(SearchHistory.objects.count(), 1)
+        self.assertEqual(writer.stats()["queued"], 0)
+
+
+class HistoryPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("analyst", email="analyst@example.com")
+        other = User.objects.create_user("other", email="other@example.com")
+        start = timezone.now()
+        # Every third row shares its timestamp with the next one, so pages must break ties on id
+        SearchHistory.objects.bulk_create(
+            SearchHistory(
+                user=user, query=f"Analyze area {i}", created_at=start + timedelta(seconds=i - i % 3 % 2)
+            )
+            for i in range(23)
+            for user in (self.user, other)
+        )
+        self.client.force_authenticate(self.user)
+
+    def _get(self, **params):
+        return self.client.get("/api/history/my/", params)
+
+    def _walk(self, page_size):
+        ids, cursor = [], None
+        while True:
+            params = {"page_size": page_size}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(1):
+                body = self._get(**params).json()
+            self.assertLessEqual(len(body["history"]), page_size)
+            ids.extend(row["id"] for row in body["history"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_match_offset_ordering(self):
+        expected = list(
+            SearchHistory.objects.filter(user=self.user)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        for page_size in (1, 5, 23, 50):
+            self.assertEqual(self._walk(page_size), expected, page_size)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self._get(page_size=10).json()
+        SearchHistory.objects.create(
+            user=self.user, query="Analyze Wakad", created_at=timezone.now() + timedelta(hours=1)
+        )
+        second = self._get(page_size=10, cursor=first["next_cursor"]).json()
+        seen = [row["id"] for row in first["history"] + second["history"]]
+        expected = SearchHistory.objects.filter(user=self.user).order_by("-created_at", "-id")
+        self.assertEqual(seen, list(expected.values_list("id", flat=True)[1:21]))
+
+    def test_page_size_is_clamped(self):
+        with self.settings(HISTORY_MAX_PAGE_SIZE=4):
+            body = self._get(page_size=100).json()
+        self.assertEqual((body["page_size"], len(body["history"])), (4, 4))
+
+    def test_invalid_params_are_rejected(self):
+        for params in ({"cursor": "not-a-cursor"}, {"page_size": "ten"}, {"page_size": 0}):
+            response = self._get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["error"]["code"], "INVALID_PAGE")
+
+
+class ResponsePayloadTests(TestCase):
+    RESPONSE = {"query": "Analyze Wakad", "summary": "Up.", "table": {"rows": [{"Area": "Wakad", "Price": 1.5}]}}
+
+    def setUp(self):
+        self.user = User.objects.create_user("analyst", email="analyst@example.com")
+
+    def _save(self, full_response, user=None):
+        HistoryWriter(mode="sync").save(full_response, user_id=(user or self.user).id, query="q")
+
+    def test_codec_roundtrip_and_canonical_digest(self):
+        digest, codec, data, size = encode_payload(self.RESPONSE)
+        self.assertEqual(codec, "zlib")
+        self.assertEqual(decode_payload(codec, memoryview(data)), self.RESPONSE)
+        self.assertEqual(digest, encode_payload(dict(reversed(list(self.RESPONSE.items()))))[0])
+        self.assertGreater(size, len(data) // 2)
+
+    def test_identical_responses_share_one_payload(self):
+        self._save(self.RESPONSE)
+        self._save(dict(self.RESPONSE))
+        self._save({**self.RESPONSE, "summary": "Down."})
+        self.assertEqual(ResponsePayload.objects.count(), 2)
+        self.assertEqual(
+            [h.get_full_response()["summary"] for h in SearchHistory.objects.order_by("id")],
+            ["Up.", "Up.", "Down."],
+        )
+
+    def test_prune_keeps_referenced_and_recent_payloads(self):
+        self._save(self.RESPONSE)
+        self._save({**self.RESPONSE, "summary": "Down."})
+        SearchHistory.objects.filter(summary=None).first().delete()
+        self.assertEqual(ResponsePayload.prune(), 0)  # too recent
+        self.assertEqual(ResponsePayload.prune(min_age_seconds=-1), 1)
+        self.assertEqual(ResponsePayload.objects.count(), 1)
+        self.assertEqual(SearchHistory.objects.get().get_full_response(), {**self.RESPONSE, "summary": "Down."})
+
+    def test_prune_command(self):
+        self._save(self.RESPONSE)
+        SearchHistory.objects.all().delete()
+        out = StringIO()
+        call_command("prune_payloads", "--min-age-seconds=-1", stdout=out)
+        self.assertIn("Deleted 1 ", out.getvalue())
+        self.assertFalse(ResponsePayload.objects.exists())
+
+    def test_deleting_a_user_drops_only_their_payloads(self):
+        admin = User.objects.create_user("boss", email="boss@example.com", password="pw", role=User.ROLE_ADMIN)
+        other = User.objects.create_user("other", email="other@example.com")
+        self._save(self.RESPONSE)
+        self._save({**self.RESPONSE, "summary": "Own."})
+        self._save(self.RESPONSE, user=other)
+
+        request = APIRequestFactory().post("/", {"password": "pw"}, format="json")
+        force_authenticate(request, admin)
+        with self.settings(HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS=-1):
+            response = DeleteUserView.as_view()(request, user_id=self.user.id)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [p.decode()["summary"] for p in ResponsePayload.objects.all()], ["Up."]
+        )
+
+
+class PayloadMigrationTests(TransactionTestCase):
+    before = [("analytics", "0005_response_payload")]
+    after = [("analytics", "0006_move_full_response_to_payloads")]
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self._migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_full_responses_move_to_shared_payloads(self):
+        apps = self._migrate(self.before)
+        HistoricalUser = apps.get_model("accounts", "User")
+        History = apps.get_model("analytics", "SearchHistory")
+        user = HistoricalUser.objects.create(username="legacy", email="legacy@example.com")
+        responses = [{"query": f"Analyze area {i % 3}", "rows": list(range(i % 3))} for i in range(7)]
+        History.objects.bulk_create(History(user=user, query="q", full_response=r) for r in responses)
+        History.objects.create(user=user, query="empty")
+
+        migration = import_module("analytics.migrations.0006_move_full_response_to_payloads")
+        with mock.patch.object(migration, "BATCH_SIZE", 3):
+            apps = self._migrate(self.after)
+        History = apps.get_model("analytics", "SearchHistory")
+        Payload = apps.get_model("analytics", "ResponsePayload")
+        self.assertEqual(Payload.objects.count(), 3)
+        rows = list(History.objects.order_by("id"))
+        self.assertTrue(all(h.full_response is None for h in rows))
+        self.assertIsNone(rows[-1].payload_id)
+        self.assertEqual(
+            [decode_payload(h.payload.codec, h.payload.data) for h in rows[:-1]], responses
+        )
+
+        apps = self._migrate(self.before)
+        History = apps.get_model("analytics", "SearchHistory")
+        self.assertEqual(
+            [h.full_response for h in History.objects.order_by("id")], responses + [None]
+        )
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN="scrape-secret")
+class MetricsViewTests(APITestCase):
+    def test_requires_admin_or_metrics_token(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        bad = self.client.get("/api/metrics/", HTTP_X_METRICS_TOKEN="wrong")
+        self.assertEqual(bad.status_code, 401)
+
+        scraped = self.client.get("/api/metrics/", HTTP_X_METRICS_TOKEN="scrape-secret")
+        self.assertEqual(scraped.status_code, 200)
+        self.assertTrue(scraped["Content-Type"].startswith("text/plain"))
+
+        user = User.objects.create_user("analyst", email="analyst@example.com")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        user.is_staff = True
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 200)
+
+    def test_analytics_info_logs_are_enabled(self):
+        # Without a LOGGING entry the root WARNING level silently dropped these
+        for name in ("analytics.services.metrics", "analytics.utils.data_loader"):
+            self.assertTrue(logging.getLogger(name).isEnabledFor(logging.INFO), name)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_grants_nothing(self):
+        response = self.client.get("/api/metrics/", HTTP_X_METRICS_TOKEN="")
+        self.assertEqual(response.status_code, 401)
+
+
+class StreamingLoaderTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        # Small chunks so every file spans several chunks and the arrays grow
+        patcher = mock.patch.object(data_loader, "STREAM_CHUNK_ROWS", 7)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _source(self):
+        source = generate_dataset(localities=6, years=5, rows_per_year=2, invalid_fraction=0.05)
+        source.loc[3, SOURCE_COLUMNS["Area"]] = None
+        source.loc[4, SOURCE_COLUMNS["Area"]] = "  Padded  "
+        return source
+
+    def test_streamed_frame_equals_whole_frame_read(self):
+        source = self._source()
+        paths = [write_dataset(source, self.dir / "data.parquet")]
+        price = SOURCE_COLUMNS["Price"]
+        source[price] = source[price].astype(object)
+        source.loc[5, price] = "n/a"
+        paths += [write_dataset(source, self.dir / f"data{suffix}") for suffix in (".csv", ".xlsx")]
+        paths.append(Path(__file__).resolve().parent.parent / "data" / "RealEstate_Dataset.xlsx")
+
+        for path in paths:
+            with self.subTest(path=path.name), self.assertLogs(data_loader.logger, "INFO") as logs:
+                pd.testing.assert_frame_equal(
+                    data_loader._parse_dataset(path), data_loader._parse_frame(path)
+                )
+                self.assertIn("(streamed)", logs.output[0])
+
+    def test_invalid_years_are_rejected_before_narrowing(self):
+        year = SOURCE_COLUMNS["Year"]
+        for bad_year in (2020.5, 40000):
+            source = self._source()
+            source.loc[len(source) - 1, year] = bad_year
+            for suffix in (".csv", ".xlsx", ".parquet"):
+                path = write_dataset(source, self.dir / f"bad{suffix}")
+                for parse in (data_loader._parse_dataset, data_loader._parse_frame):
+                    with self.subTest(year=bad_year, path=path.name, parse=parse.__name__):
+                        with self.assertRaisesRegex(ValueError, "Year must be a whole number"):
+                            parse(path)
+
+    def test_missing_required_column(self):
+        path = write_dataset(self._source().drop(columns=SOURCE_COLUMNS["Size"]), self.dir / "data.csv")
+        with self.assertRaisesRegex(ValueError, "Missing required mapped columns: Size"):
+            data_loader._parse_dataset(path)
+
+
+class IncrementalMergeTests(SimpleTestCase):
+    def _frames(self, rng):
+        areas = [f"Area {i}" for i in rng.choice(40, rng.integers(1, 12), replace=False)]
+        df = random_frame(rng, int(rng.integers(1, 200)), areas, range(2010, 2020))
+        delta_areas = areas + [f"Area {i}" for i in rng.choice(50, 2)]
+        delta = random_frame(rng, int(rng.integers(1, 30)), delta_areas, range(2015, 2022))
+        return (
+            sort_by_area_year(df.astype({"Year": "int16"})),
+            delta.astype({"Year": "int16", "Price": "float32", "Area": "category"}),
+        )
+
+    def test_merge_and_cube_update_equal_a_full_rebuild(self):
+        rng = np.random.default_rng(6)
+        for _ in range(60):
+            df, delta = self._frames(rng)
+            for upsert in (False, True):
+                kept = df
+                if upsert:
+                    replaced = set(zip(delta["Area"].astype(str), delta["Year"]))
+                    kept = df[[key not in replaced for key in zip(df["Area"].astype(str), df["Year"])]]
+                rebuilt = sort_by_area_year(
+                    pd.concat(
+                        [kept.astype({"Area": str}), delta.astype({"Area": str})], ignore_index=True
+                    )
+                )
+
+                merged = merge_by_area_year(df, delta, upsert=upsert)
+                pd.testing.assert_frame_equal(merged, rebuilt)
+                pd.testing.assert_frame_equal(
+                    update_area_year_cube(build_area_year_cube(df), merged, delta),
+                    build_area_year_cube(rebuilt),
+                )
+
+    def test_with_areas_matches_a_fresh_matcher(self):
+        base = ["Wakad", "Baner", "Hinjewadi Phase 1"]
+        added = ["Baner Road", "Hinjewadi Phase 2", "Aundh", "wakad"]
+        matcher = AreaMatcher(base)
+        extended = matcher.with_areas(added)
+        fresh = AreaMatcher(base + added)
+        for query in (
+            "Compare Baner Road and Wakad",
+            "hinjewadi phase 2 vs Hinjewadi Phase 1",
+            "Analyze Aundh, Baner",
+        ):
+            self.assertEqual(extended.match(query), fresh.match(query), query)
+        # The serving matcher is left as it was
+        self.assertEqual(matcher.match("Compare Baner Road and Aundh"), ["Baner"])
+        self.assertEqual(len(matcher), 3)
+        self.assertEqual(len(extended), 6)
+
+
+class DatasetMergeTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        settings_patch = override_settings(
+            DEFAULT_DATASET_PATH=str(write_dataset(generate_dataset(4, 3), self.dir / "base.xlsx")),
+            DATASET_CACHE_DIR=str(self.dir / "cache"),
+            DATASET_REGISTRY_PATH=str(self.dir / "registry" / "active.json"),
+            DATASET_SHARED_MEMORY=False,
+            DATASET_VERSION_CHECK_SECONDS=3600,
+        )
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        state = mock.patch.multiple(
+            DataRepository, _snapshot=None, _pending_path=None, _registry_token=None
+        )
+        state.start()
+        self.addCleanup(state.stop)
+
+    def _delta(self, name):
+        return write_dataset(generate_dataset(6, 4, first_year=2011, seed=1), self.dir / name)
+
+    def test_merged_files_are_loaded_without_rehashing_or_sidecars(self):
+        with self.assertLogs("analytics", "INFO"):
+            DataRepository.get_snapshot()
+            DataRepository.merge_with_file(str(self._delta("delta1.csv")), upsert=True)
+            first = DataRepository.get_current_path()
+            merged = DataRepository.merge_with_file(str(self._delta("delta2.csv")))
+        entry = DataRepository._registry().read()
+
+        self.assertFalse(Path(first).exists())  # superseded merged file removed
+        self.assertEqual(entry["path"], DataRepository.get_current_path())
+        self.assertEqual(len(list((self.dir / "cache").iterdir())), 1)  # base.xlsx only
+
+        # Another worker loading the published merge: no hashing, same frame
+        DataRepository._snapshot = None
+        with mock.patch.object(data_loader, "file_sha256", side_effect=AssertionError("rehashed")):
+            snapshot = DataRepository._snapshot_from_entry(entry)
+        pd.testing.assert_frame_equal(snapshot.df, merged)
+        self.assertEqual(snapshot.fingerprint, entry["fingerprint"])
+        pd.testing.assert_frame_equal(snapshot.cube, build_area_year_cube(merged))
+        self.assertEqual(len(list((self.dir / "cache").iterdir())), 1)
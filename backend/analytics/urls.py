@@ -1,8 +1,12 @@
 from django.urls import path
 from .views import (
     HealthCheckView,
+    MetricsView,
     AnalyzeView,
+    AnalyzeBatchView,
+    AnalyzeSummaryView,
     DatasetUploadView,
+    DatasetJobView,
     MyHistoryView,
     AdminUserHistoryView,
     ExportAllHistoryView
@@ -10,8 +14,12 @@ from .views import (
 
 urlpatterns = [
     path("health/", HealthCheckView.as_view()),
+    path("metrics/", MetricsView.as_view()),
     path("analyze/", AnalyzeView.as_view()),
+    path("analyze/batch/", AnalyzeBatchView.as_view()),
+    path("analyze/summary/<str:job_id>/", AnalyzeSummaryView.as_view()),
     path("dataset/upload/", DatasetUploadView.as_view()),
+    path("dataset/jobs/<str:job_id>/", DatasetJobView.as_view()),
     path("history/my/", MyHistoryView.as_view()),
     path("history/admin/<int:user_id>/", AdminUserHistoryView.as_view()),
     path("history/export-all/", ExportAllHistoryView.as_view()),  # NEW
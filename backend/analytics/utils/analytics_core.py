@@ -1,14 +1,206 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .timing import StageTimer, timed
 
-def _filter_by_intent(df: pd.DataFrame, intent: Dict[str, Any]) -> pd.DataFrame:
-    filtered = df.copy()
+CUBE_MEASURES = ["Price", "Demand", "Size"]
+CUBE_STATS = ["sum", "count", "mean"]
+
+TABLE_COLUMNS = ["Year", "Area", "Price", "Demand", "Size"]
+TABLE_FORMATS = ("rows", "columns")
+
+# Area -> [start, stop) row positions in a frame ordered by sort_by_area_year
+AreaIndex = Dict[str, Tuple[int, int]]
+
+
+def sort_by_area_year(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return `df` with Area as a categorical (categories in sorted order) and
+    rows ordered by (Area, Year). A frame that already has that layout is
+    returned as-is, so memory-mapped snapshots are not copied.
+    """
+    area = df["Area"]
+    recode = not (
+        isinstance(area.dtype, pd.CategoricalDtype) and area.cat.categories.is_monotonic_increasing
+    )
+    if recode:
+        area = area.astype(pd.CategoricalDtype(sorted(area.dropna().unique())))
+
+    codes = area.cat.codes.to_numpy()
+    years = df["Year"].to_numpy(dtype="float64", na_value=np.nan)
+    order = np.lexsort((years, codes))
+    in_order = bool((order == np.arange(order.size)).all())
+
+    if not recode and in_order:
+        return df
+    if recode:
+        df = df.assign(Area=area)
+    if not in_order:
+        df = df.take(order)
+    return df.reset_index(drop=True)
+
+
+def build_area_index(df: pd.DataFrame) -> AreaIndex:
+    """Row range of every area in a frame ordered by sort_by_area_year."""
+    codes = df["Area"].cat.codes.to_numpy()
+    categories = df["Area"].cat.categories
+    bounds = np.searchsorted(codes, np.arange(len(categories) + 1))
+    return {
+        str(area): (int(start), int(stop))
+        for area, start, stop in zip(categories, bounds[:-1], bounds[1:])
+        if stop > start
+    }
+
+
+def build_area_year_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pre-aggregate the dataset to one row per (Area, Year).
+
+    Columns are "<measure>_<stat>" (e.g. "Price_mean"); means skip NaN the
+    same way a groupby over the raw rows does. Measures are aggregated in
+    float64 even when the dataset stores them as float32.
+    """
+    measures = df[["Area", "Year"] + CUBE_MEASURES].astype({m: "float64" for m in CUBE_MEASURES})
+    cube = measures.groupby(["Area", "Year"], sort=True, observed=True)[CUBE_MEASURES].agg(CUBE_STATS)
+    cube.columns = [f"{measure}_{stat}" for measure, stat in cube.columns]
+    return cube
+
+
+def _area_year_keys(codes: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """One int64 per (Area code, Year) that sorts the same way as the pair."""
+    return (codes.astype("int64") << 16) | (years.astype("int64") + 32768)
+
+
+def _in_key_ranges(keys: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+    """Mask of the entries of sorted `keys` that equal one of `wanted`."""
+    wanted = np.unique(wanted)
+    marks = np.zeros(len(keys) + 1, dtype="int32")
+    np.add.at(marks, np.searchsorted(keys, wanted, side="left"), 1)
+    np.add.at(marks, np.searchsorted(keys, wanted, side="right"), -1)
+    return np.cumsum(marks[:-1]) > 0
+
+
+def _interleave(keys: np.ndarray, new_keys: np.ndarray) -> np.ndarray:
+    """
+    Gather order over concat(keys, new_keys), both sorted, that keeps the
+    result sorted; new entries go after existing ones with the same key.
+    """
+    positions = np.searchsorted(keys, new_keys, side="right") + np.arange(len(new_keys))
+    gather = np.empty(len(keys) + len(new_keys), dtype="int64")
+    is_new = np.zeros(len(gather), dtype=bool)
+    is_new[positions] = True
+    gather[positions] = len(keys) + np.arange(len(new_keys))
+    gather[~is_new] = np.arange(len(keys))
+    return gather
+
+
+def merge_by_area_year(df: pd.DataFrame, delta: pd.DataFrame, upsert: bool = False) -> pd.DataFrame:
+    """
+    Insert the rows of `delta` into `df` (ordered by sort_by_area_year) and
+    return a frame with the same layout. With `upsert`, rows of `df` whose
+    (Area, Year) appears in `delta` are dropped first, so the delta replaces
+    them.
+
+    The result equals sort_by_area_year(pd.concat([kept, delta])), but the
+    existing rows are only located by binary search and copied once in
+    order, so no full re-sort happens.
+    """
+    categories = df["Area"].cat.categories
+    delta_areas = delta["Area"].astype(str)
+    merged_categories = categories.union(pd.Index(delta_areas.unique()))
+
+    codes = df["Area"].cat.codes.to_numpy()
+    if len(merged_categories) != len(categories):
+        # Old categories keep their relative order in the sorted union
+        codes = merged_categories.get_indexer(categories)[codes]
+    keys = _area_year_keys(codes, df["Year"].to_numpy())
+
+    delta_codes = merged_categories.get_indexer(delta_areas)
+    delta_keys = _area_year_keys(delta_codes, delta["Year"].to_numpy())
+    delta_order = np.argsort(delta_keys, kind="stable")
+    delta_codes, delta_keys = delta_codes[delta_order], delta_keys[delta_order]
+
+    kept = np.arange(len(df))
+    if upsert:
+        kept = np.flatnonzero(~_in_key_ranges(keys, delta_keys))
+        keys = keys[kept]
+    gather = _interleave(keys, delta_keys)
+
+    area_codes = np.concatenate([codes[kept], delta_codes])[gather]
+    rest = [c for c in df.columns if c != "Area"]
+    combined = pd.concat(
+        [df[rest].take(kept), delta.drop(columns="Area").iloc[delta_order]],
+        ignore_index=True,
+    )
+    merged = combined.take(gather).reset_index(drop=True)
+    area = pd.Categorical.from_codes(area_codes, categories=merged_categories)
+    merged.insert(list(df.columns).index("Area"), "Area", area)
+    return merged
+
+
+def update_area_year_cube(cube: pd.DataFrame, df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Refresh the cube of `df` (already merged with `delta`) for the (Area,
+    Year) pairs present in `delta` only: just their rows are aggregated and
+    every other cube row is reused in place.
+    """
+    categories = df["Area"].cat.categories
+    affected = _area_year_keys(
+        categories.get_indexer(delta["Area"].astype(str)), delta["Year"].to_numpy()
+    )
+
+    keys = _area_year_keys(df["Area"].cat.codes.to_numpy(), df["Year"].to_numpy())
+    fresh = build_area_year_cube(df.take(np.flatnonzero(_in_key_ranges(keys, affected))))
+
+    def index_keys(frame: pd.DataFrame) -> np.ndarray:
+        areas, years = frame.index.levels
+        codes = categories.get_indexer(areas)[frame.index.codes[0]]
+        return _area_year_keys(codes, years.to_numpy()[frame.index.codes[1]])
+
+    cube_keys = index_keys(cube)
+    unchanged = np.flatnonzero(~_in_key_ranges(cube_keys, affected))
+    fresh_keys = index_keys(fresh)
+    gather = _interleave(cube_keys[unchanged], fresh_keys)
+
+    merged_keys = np.concatenate([cube_keys[unchanged], fresh_keys])[gather]
+    index = pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical.from_codes((merged_keys >> 16).astype("int32"), categories=categories),
+            ((merged_keys & 0xFFFF) - 32768).astype(df["Year"].dtype),
+        ],
+        names=["Area", "Year"],
+    )
+    return pd.DataFrame(
+        {
+            column: np.concatenate([cube[column].to_numpy()[unchanged], fresh[column].to_numpy()])[gather]
+            for column in cube.columns
+        },
+        index=index,
+    )
+
+
+def _rows_for_areas(df: pd.DataFrame, areas, area_index: AreaIndex) -> pd.DataFrame:
+    """Select areas by row range: a view for one area, a gather of matched rows otherwise."""
+    ranges = sorted(area_index[a] for a in set(areas) if a in area_index)
+    if not ranges:
+        return df.iloc[0:0]
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        return df.iloc[start:stop]
+    return df.take(np.concatenate([np.arange(start, stop) for start, stop in ranges]))
+
+
+def _filter_by_intent(
+    df: pd.DataFrame, intent: Dict[str, Any], area_index: Optional[AreaIndex] = None
+) -> pd.DataFrame:
+    filtered = df
 
     areas = intent.get("areas") or []
-    if areas:
+    if areas and area_index is not None:
+        filtered = _rows_for_areas(df, areas, area_index)
+    elif areas:
         filtered = filtered[filtered["Area"].isin(areas)]
 
     years = intent.get("years") or []
@@ -17,14 +209,74 @@ def _filter_by_intent(df: pd.DataFrame, intent: Dict[str, Any]) -> pd.DataFrame:
     if years:
         filtered = filtered[filtered["Year"].isin(years)]
 
-    if last_n and not years:
-        max_year = filtered["Year"].max()
+    if last_n and not years and not filtered.empty:
+        # Plain int: arithmetic on the int16 Year scalar would overflow for a large last_n
+        max_year = int(filtered["Year"].max())
         min_year = max_year - last_n + 1
         filtered = filtered[(filtered["Year"] >= min_year) & (filtered["Year"] <= max_year)]
 
     return filtered
 
 
+def _slice_cube(cube: pd.DataFrame, intent: Dict[str, Any]) -> pd.DataFrame:
+    """Same filter semantics as _filter_by_intent, applied to the cube index."""
+    sliced = cube
+
+    areas = intent.get("areas") or []
+    if areas:
+        sliced = sliced[sliced.index.get_level_values("Area").isin(areas)]
+
+    years = intent.get("years") or []
+    last_n = intent.get("last_n_years") or 0
+
+    if years:
+        sliced = sliced[sliced.index.get_level_values("Year").isin(years)]
+
+    if last_n and not years and not sliced.empty:
+        cube_years = sliced.index.get_level_values("Year")
+        max_year = int(cube_years.max())
+        min_year = max_year - last_n + 1
+        sliced = sliced[(cube_years >= min_year) & (cube_years <= max_year)]
+
+    return sliced
+
+
+def _nullable_floats(series: pd.Series) -> list:
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    out = values.tolist()
+    for i in np.flatnonzero(np.isnan(values)):
+        out[i] = None
+    return out
+
+
+def build_table_payload(frame: pd.DataFrame, table_format: str = "rows") -> Dict[str, Any]:
+    """
+    Serialize the table columns of `frame` to JSON-ready values in one
+    columnar pass (NaN -> None).
+
+    "rows" gives {"columns": [...], "rows": [{...}, ...]};
+    "columns" gives {"columns": [...], "data": {"Year": [...], ...}}.
+    """
+    if frame.empty:
+        data = {}
+        columns = []
+    else:
+        columns = TABLE_COLUMNS
+        data = {
+            "Year": frame["Year"].astype("int64").tolist(),
+            "Area": frame["Area"].astype(str).tolist(),
+            "Price": _nullable_floats(frame["Price"]),
+            "Demand": _nullable_floats(frame["Demand"]),
+            "Size": _nullable_floats(frame["Size"]),
+        }
+
+    if table_format == "columns":
+        return {"columns": columns, "data": data}
+
+    rows = [dict(zip(columns, values)) for values in zip(*(data[c] for c in columns))]
+    return {"columns": columns, "rows": rows}
+
+
 def _trend_direction(values):
     values = list(values)
     if len(values) < 2:
@@ -42,14 +294,30 @@ def _compute_growth_pct(first: float, last: float) -> float:
     return (last - first) / first * 100.0
 
 
-def analyze_intent(df: pd.DataFrame, intent: Dict[str, Any]) -> Dict[str, Any]:
-    filtered = _filter_by_intent(df, intent)
+def analyze_intent(
+    df: pd.DataFrame,
+    intent: Dict[str, Any],
+    cube: Optional[pd.DataFrame] = None,
+    table_format: str = "rows",
+    timer: Optional[StageTimer] = None,
+    area_index: Optional[AreaIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Filter `df` by the intent and build charts, table and insights.
+
+    `cube` (build_area_year_cube) replaces the per-query groupby, and
+    `area_index` (build_area_index, for a frame ordered by
+    sort_by_area_year) replaces the full-frame area mask with row-range
+    lookups, so the cost scales with the matched rows.
+    """
+    with timed(timer, "filter"):
+        filtered = _filter_by_intent(df, intent, area_index)
 
     if filtered.empty:
         return {
             "filtered_df": filtered,
             "charts": [],
-            "table": {"columns": [], "rows": []},
+            "table": build_table_payload(filtered, table_format),
             "insights": {
                 "areas": intent.get("areas", []),
                 "years": [],
@@ -59,92 +327,88 @@ def analyze_intent(df: pd.DataFrame, intent: Dict[str, Any]) -> Dict[str, Any]:
             },
         }
 
-    areas = sorted(filtered["Area"].unique().tolist())
-    years = sorted(filtered["Year"].dropna().unique().tolist())
-
-    group = (
-        filtered.groupby(["Area", "Year"])
-        .agg({"Price": "mean", "Demand": "mean"})
-        .reset_index()
-        .sort_values(["Area", "Year"])
-    )
+    with timed(timer, "aggregate"):
+        areas = sorted(filtered["Area"].unique().tolist())
+        years = sorted(filtered["Year"].dropna().unique().tolist())
 
-    price_trend_direction = {}
-    demand_trend_direction = {}
-    price_growth_pct = {}
+        if cube is not None:
+            group = (
+                _slice_cube(cube, intent)[["Price_mean", "Demand_mean"]]
+                .rename(columns={"Price_mean": "Price", "Demand_mean": "Demand"})
+                .reset_index()
+            )
+        else:
+            group = (
+                filtered.groupby(["Area", "Year"], observed=True)
+                .agg({"Price": "mean", "Demand": "mean"})
+                .reset_index()
+                .sort_values(["Area", "Year"])
+            )
 
-    price_chart_series = []
-    demand_chart_series = []
+        price_trend_direction = {}
+        demand_trend_direction = {}
+        price_growth_pct = {}
 
-    for area in areas:
-        area_data = group[group["Area"] == area].sort_values("Year")
-        prices = area_data["Price"].tolist()
-        demands = area_data["Demand"].tolist()
-        yrs = area_data["Year"].tolist()
+        price_chart_series = []
+        demand_chart_series = []
 
-        if not yrs:
-            continue
+        for area in areas:
+            area_data = group[group["Area"] == area].sort_values("Year")
+            prices = area_data["Price"].tolist()
+            demands = area_data["Demand"].tolist()
+            yrs = area_data["Year"].tolist()
 
-        price_trend_direction[area] = _trend_direction(prices)
-        demand_trend_direction[area] = _trend_direction(demands)
+            if not yrs:
+                continue
 
-        if len(prices) >= 2:
-            price_growth_pct[area] = _compute_growth_pct(prices[0], prices[-1])
-        else:
-            price_growth_pct[area] = 0.0
+            price_trend_direction[area] = _trend_direction(prices)
+            demand_trend_direction[area] = _trend_direction(demands)
 
-        price_chart_series.append(
-            {
-                "name": area,
-                "data": [
-                    {"Year": int(y), "Price": float(p)} for y, p in zip(yrs, prices)
-                ],
-            }
-        )
-
-        demand_chart_series.append(
-            {
-                "name": area,
-                "data": [
-                    {"Year": int(y), "Demand": float(d)} for y, d in zip(yrs, demands)
-                ],
-            }
-        )
-
-    charts = [
-        {
-            "id": "price_trend",
-            "title": "Price Trend by Year",
-            "type": "line",
-            "xKey": "Year",
-            "yKeys": ["Price"],
-            "series": price_chart_series,
-        },
-        {
-            "id": "demand_trend",
-            "title": "Demand Trend by Year",
-            "type": "line",
-            "xKey": "Year",
-            "yKeys": ["Demand"],
-            "series": demand_chart_series,
-        },
-    ]
+            if len(prices) >= 2:
+                price_growth_pct[area] = _compute_growth_pct(prices[0], prices[-1])
+            else:
+                price_growth_pct[area] = 0.0
 
-    table_columns = ["Year", "Area", "Price", "Demand", "Size"]
-    table_rows = []
+            price_chart_series.append(
+                {
+                    "name": area,
+                    "data": [
+                        {"Year": int(y), "Price": float(p)} for y, p in zip(yrs, prices)
+                    ],
+                }
+            )
 
-    filtered_sorted = filtered.sort_values(["Area", "Year"])
+            demand_chart_series.append(
+                {
+                    "name": area,
+                    "data": [
+                        {"Year": int(y), "Demand": float(d)} for y, d in zip(yrs, demands)
+                    ],
+                }
+            )
 
-    for _, row in filtered_sorted.iterrows():
-        table_rows.append(
+        charts = [
+            {
+                "id": "price_trend",
+                "title": "Price Trend by Year",
+                "type": "line",
+                "xKey": "Year",
+                "yKeys": ["Price"],
+                "series": price_chart_series,
+            },
             {
-                "Year": int(row["Year"]),
-                "Area": str(row["Area"]),
-                "Price": float(row["Price"]) if not np.isnan(row["Price"]) else None,
-                "Demand": float(row["Demand"]) if not np.isnan(row["Demand"]) else None,
-                "Size": float(row["Size"]) if not np.isnan(row["Size"]) else None,
-            }
-        )
+                "id": "demand_trend",
+                "title": "Demand Trend by Year",
+                "type": "line",
+                "xKey": "Year",
+                "yKeys": ["Demand"],
+                "series": demand_chart_series,
+            },
+        ]
+
+    with timed(timer, "table"):
+        filtered_sorted = filtered.sort_values(["Area", "Year"])
+        table = build_table_payload(filtered_sorted, table_format)
 
     insights = {
         "areas": areas,
@@ -157,6 +421,6 @@ def analyze_intent(df: pd.DataFrame, intent: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "filtered_df": filtered_sorted,
         "charts": charts,
-        "table": {"columns": table_columns, "rows": table_rows},
+        "table": table,
         "insights": insights,
     }
@@ -0,0 +1,132 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class AreaMatcher:
+    """
+    Matches every known locality in a query with a single compiled regex.
+
+    Area names are folded into a character trie and emitted as one
+    prefix-factored alternation, so a query is scanned once regardless of
+    how many localities the dataset contains. Longer names win over their
+    prefixes ("Baner Road" before "Baner").
+    """
+
+    def __init__(self, areas: Iterable[str]):
+        self._canonical: Dict[str, str] = {}
+        self._trie: Dict[str, dict] = {}
+        self._pattern: Optional[re.Pattern] = None
+        self.add_areas(areas)
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def add_areas(self, areas: Iterable[str]) -> List[str]:
+        """Register new localities; returns the ones that were not known yet."""
+        return self._insert(areas, copied=None)
+
+    def with_areas(self, areas: Iterable[str]) -> "AreaMatcher":
+        """
+        A matcher that also knows `areas`, leaving this one untouched (it may
+        be serving other threads). Only the trie nodes on the new names' paths
+        are copied; when nothing is new, this matcher is returned as-is.
+        """
+        areas = [area for area in areas if area is not None]
+        if all(str(area).strip().lower() in self._canonical for area in areas):
+            return self
+        clone = AreaMatcher(())
+        clone._canonical = dict(self._canonical)
+        clone._trie = dict(self._trie)
+        clone._insert(areas, copied={id(clone._trie)})
+        return clone
+
+    def _insert(self, areas: Iterable[str], copied: Optional[Set[int]]) -> List[str]:
+        # copied: ids of nodes owned by this matcher; None means every node is
+        added = []
+        for area in areas:
+            if area is None:
+                continue
+            name = str(area).strip()
+            key = name.lower()
+            if not key or key in self._canonical:
+                continue
+            self._canonical[key] = name
+            node = self._trie
+            for char in key:
+                child = node.get(char)
+                if child is None:
+                    child = {}
+                elif copied is not None and id(child) not in copied:
+                    child = dict(child)
+                if copied is not None:
+                    copied.add(id(child))
+                node[char] = child
+                node = child
+            node[""] = {}
+            added.append(name)
+        if added:
+            self._pattern = None
+        return added
+
+    @property
+    def pattern(self) -> Optional[re.Pattern]:
+        if self._pattern is None and self._canonical:
+            self._pattern = re.compile(r"\b(?:" + _trie_to_regex(self._trie) + r")\b")
+        return self._pattern
+
+    def match(self, text: str) -> List[str]:
+        """Return matched areas in order of first appearance, deduplicated."""
+        pattern = self.pattern
+        if pattern is None:
+            return []
+
+        lowercase = text.lower()
+        matched = []
+        seen = set()
+        for m in pattern.finditer(lowercase):
+            area = self._canonical[m.group(0)]
+            if area not in seen:
+                seen.add(area)
+                matched.append(area)
+
+        # Fallback: a whole run of words that equals an Area (e.g. odd spacing)
+        if not matched:
+            for word in re.findall(r"[a-zA-Z]+(?:\s+[a-zA-Z]+)*", text):
+                key = " ".join(word.lower().split())
+                area = self._canonical.get(key)
+                if area and area not in seen:
+                    seen.add(area)
+                    matched.append(area)
+
+        return matched
+
+
+def _trie_to_regex(node: Dict[str, dict]) -> str:
+    """Render a trie node as a regex, factoring out shared prefixes."""
+    alternatives = []
+    single_chars = []
+    optional = False
+
+    for char in sorted(node):
+        if char == "":
+            optional = True
+            continue
+        child = node[char]
+        if list(child) == [""]:
+            single_chars.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + _trie_to_regex(child))
+
+    # Longer alternatives first so the greedy engine prefers the longest name
+    alternatives.sort(key=len, reverse=True)
+    if single_chars:
+        if len(single_chars) == 1:
+            alternatives.append(single_chars[0])
+        else:
+            alternatives.append("[" + "".join(single_chars) + "]")
+
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+
+    body = "(?:" + "|".join(alternatives) + ")"
+    return body + "?" if optional else body
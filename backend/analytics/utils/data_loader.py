@@ -1,4 +1,12 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
 import pandas as pd
 
 """
@@ -26,52 +34,414 @@ COLUMN_MAPPING = {
 
 REQUIRED_COLUMNS = ["Year", "Area", "Price", "Demand", "Size"]
 
+MEASURE_COLUMNS = ["Price", "Demand", "Size"]
+
+# Bump whenever the normalization below changes so stale caches are ignored
+LOADER_SCHEMA_VERSION = 2
+
+# Formats parsed chunk by chunk; anything else (.xls) is read whole by pandas
+STREAMING_SUFFIXES = (".xlsx", ".csv", ".parquet")
+STREAM_CHUNK_ROWS = 20_000
+
+# progress(stage, **info), e.g. progress("validating", rows_parsed=1200)
+ProgressCallback = Callable[..., None]
+
+logger = logging.getLogger(__name__)
+
 
 def normalize_column_name(col: str) -> str:
     """Normalize: remove spaces, lowercase, and collapse multiple spaces."""
     return col.strip().lower().replace("\n", " ").replace("  ", " ")
 
 
-def load_dataset_from_path(path: str) -> pd.DataFrame:
+def mapping_version() -> str:
+    """Short hash of the column mapping and loader schema version."""
+    spec = json.dumps(
+        {
+            "mapping": COLUMN_MAPPING,
+            "required": REQUIRED_COLUMNS,
+            "schema": LOADER_SCHEMA_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()[:12]
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(path: str, keep_extra_columns: bool = False) -> str:
+    """Identifies a dataset by file content and the mapping used to normalize it."""
+    suffix = "-extra" if keep_extra_columns else ""
+    return f"{file_sha256(Path(path))[:32]}-{mapping_version()}{suffix}"
+
+
+def merged_fingerprint(
+    base_fingerprint: str, delta_path: str, mode: str, keep_extra_columns: bool = False
+) -> str:
+    """
+    Fingerprint of the dataset `base_fingerprint` with a delta file merged in
+    (`mode` append/upsert); only the delta file is hashed.
+    """
+    spec = f"{base_fingerprint}:{mode}:{file_sha256(Path(delta_path))}"
+    suffix = "-extra" if keep_extra_columns else ""
+    return f"{hashlib.sha256(spec.encode('utf-8')).hexdigest()[:32]}-{mapping_version()}{suffix}"
+
+
+def _read_cache(cache_path: Path) -> Optional[pd.DataFrame]:
+    if not cache_path.exists():
+        return None
+    try:
+        return pd.read_parquet(cache_path)
+    except Exception as e:
+        logger.warning("Ignoring unreadable dataset cache %s: %s", cache_path, e)
+        return None
+
+
+def _write_cache(df: pd.DataFrame, cache_path: Path) -> None:
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        # Cache is best-effort (e.g. pyarrow missing or mixed-type extra columns)
+        logger.warning("Could not write dataset cache %s: %s", cache_path, e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def report_progress(progress: Optional[ProgressCallback], stage: str, **info: Any) -> None:
+    if progress is not None:
+        progress(stage, **info)
+
+
+def load_dataset_from_path(
+    path: str,
+    cache_dir: Optional[str] = None,
+    keep_extra_columns: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    fingerprint: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Load and normalize a dataset file into the compact schema: Area as a
+    category, Year as int16, Price/Demand/Size as float32 where that is
+    lossless (float64 otherwise). Unmapped columns are dropped unless
+    `keep_extra_columns` is set.
+
+    When `cache_dir` is given, the normalized frame is stored there as a
+    Parquet sidecar keyed by dataset_fingerprint() (or `fingerprint`, when
+    the caller already knows it) and later loads of the same file skip the
+    Excel parse entirely. Parquet files are read directly and get no sidecar.
+
+    `progress` is called as stages complete ("reading", "validating").
+    """
     file_path = Path(path)
 
     if not file_path.exists():
         raise FileNotFoundError(f"Dataset file not found at: {file_path}")
 
-    df = pd.read_excel(file_path)
+    if not cache_dir or file_path.suffix.lower() == ".parquet":
+        return _parse_dataset(file_path, keep_extra_columns, progress)
+
+    fingerprint = fingerprint or dataset_fingerprint(str(file_path), keep_extra_columns)
+    cache_path = Path(cache_dir) / f"{fingerprint}.parquet"
+    df = _read_cache(cache_path)
+    if df is None:
+        df = _parse_dataset(file_path, keep_extra_columns, progress)
+        _write_cache(df, cache_path)
+    return df
+
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    """float32 when every value survives the round trip exactly, else float64."""
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    narrow = values.astype("float32")
+    if np.array_equal(narrow.astype("float64"), values, equal_nan=True):
+        return pd.Series(narrow, index=series.index, name=series.name)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
 
-    # Clean column names
-    original_columns = df.columns.tolist()
-    normalized_to_original = {normalize_column_name(c): c for c in original_columns}
 
-    new_columns = {}
+YEAR_DTYPE = np.int16
 
+
+def _check_years(years: pd.Series) -> None:
+    """Reject years that would not survive the int16 cast (fractions, out of range)."""
+    values = years.to_numpy(dtype="float64")
+    limits = np.iinfo(YEAR_DTYPE)
+    bad = (values != np.round(values)) | (values < limits.min) | (values > limits.max)
+    if bad.any():
+        examples = ", ".join(str(v) for v in pd.unique(values[bad])[:5])
+        raise ValueError(
+            f"Year must be a whole number between {limits.min} and {limits.max}; "
+            f"{int(bad.sum())} rows have other values (e.g. {examples})."
+        )
+
+
+def _map_headers(headers) -> Dict[Any, str]:
+    """Source header -> internal name, for every header (unmapped ones keep their name)."""
+    normalized_to_original = {
+        normalize_column_name(str(h)): h for h in headers if h is not None
+    }
+    renames = {h: h for h in headers if h is not None}
     for norm, original in normalized_to_original.items():
         if norm in COLUMN_MAPPING:
             # Use our required system name
-            new_columns[original] = COLUMN_MAPPING[norm]
-        else:
-            # Keep original for extra unused columns
-            new_columns[original] = original
+            renames[original] = COLUMN_MAPPING[norm]
+    return renames
 
-    # Rename recognized columns
-    df.rename(columns=new_columns, inplace=True)
 
-    # Check required columns exist after mapping
-    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+def _check_required(columns) -> None:
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
     if missing:
         raise ValueError(
             f"Missing required mapped columns: {', '.join(missing)}\n\n"
-            f"Detected columns: {', '.join(df.columns)}"
+            f"Detected columns: {', '.join(str(c) for c in columns)}"
         )
 
-    # Cleanup and convert types
-    df["Year"] = pd.to_numeric(df["Year"], errors="coerce").astype("Int64")
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df["Demand"] = pd.to_numeric(df["Demand"], errors="coerce")
-    df["Size"] = pd.to_numeric(df["Size"], errors="coerce")
 
+def _parse_dataset(
+    file_path: Path, keep_extra_columns: bool = False, progress: Optional[ProgressCallback] = None
+) -> pd.DataFrame:
+    """
+    Parse .xlsx, .csv and .parquet files chunk by chunk into preallocated
+    typed arrays (peak memory stays close to the final frame). .xls files
+    and keep_extra_columns go through a whole-frame pandas read instead.
+    """
+    suffix = file_path.suffix.lower()
+    if keep_extra_columns or suffix not in STREAMING_SUFFIXES:
+        return _parse_frame(file_path, keep_extra_columns, progress)
+
+    if suffix == ".csv":
+        headers, chunks, expected_rows = _csv_chunks(file_path)
+    elif suffix == ".parquet":
+        headers, chunks, expected_rows = _parquet_chunks(file_path)
+    else:
+        headers, chunks, expected_rows = _xlsx_chunks(file_path)
+
+    renames = _map_headers(headers)
+    _check_required(list(renames.values()))
+    source = {internal: original for original, internal in renames.items() if internal in REQUIRED_COLUMNS}
+
+    report_progress(progress, "reading", rows_expected=expected_rows)
+    builder = _CompactFrameBuilder(expected_rows)
+    rows_parsed = 0
+    for chunk in chunks(source):
+        rows_parsed += len(chunk)
+        builder.append(chunk)
+        report_progress(progress, "reading", rows_parsed=rows_parsed, rows_expected=expected_rows)
+
+    report_progress(progress, "validating", rows_parsed=rows_parsed)
+    df = builder.build()
+
+    logger.info(
+        "Loaded %s: %d of %d rows, %.2f MB compact (streamed)",
+        file_path.name,
+        len(df),
+        rows_parsed,
+        _memory_mb(df),
+    )
+    return df
+
+
+def _xlsx_chunks(file_path: Path):
+    """Header row, chunk generator and row-count hint for the first sheet."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    rows = sheet.iter_rows(values_only=True)
+    headers = list(next(rows, ()))
+    expected_rows = max((sheet.max_row or 1) - 1, 0) or None
+
+    def chunks(source):
+        positions = {name: headers.index(original) for name, original in source.items()}
+        try:
+            while True:
+                batch = list(itertools.islice(rows, STREAM_CHUNK_ROWS))
+                if not batch:
+                    return
+                yield pd.DataFrame(
+                    {
+                        name: [row[pos] if pos < len(row) else None for row in batch]
+                        for name, pos in positions.items()
+                    }
+                )
+        finally:
+            workbook.close()
+
+    return headers, chunks, expected_rows
+
+
+def _csv_chunks(file_path: Path):
+    headers = pd.read_csv(file_path, nrows=0).columns.tolist()
+
+    def chunks(source):
+        originals = {original: name for name, original in source.items()}
+        reader = pd.read_csv(
+            file_path,
+            usecols=list(originals),
+            dtype={source["Area"]: object},
+            chunksize=STREAM_CHUNK_ROWS,
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk.rename(columns=originals)
+
+    return headers, chunks, None
+
+
+def _parquet_chunks(file_path: Path):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file_path)
+    headers = parquet_file.schema_arrow.names
+
+    def chunks(source):
+        originals = {original: name for name, original in source.items()}
+        for batch in parquet_file.iter_batches(batch_size=STREAM_CHUNK_ROWS, columns=list(originals)):
+            yield batch.to_pandas().rename(columns=originals)
+
+    return headers, chunks, parquet_file.metadata.num_rows
+
+
+class _CompactFrameBuilder:
+    """
+    Accumulates cleaned chunks into typed arrays that grow geometrically
+    from a row-count hint: Area as int32 codes, Year as int16, measures
+    as float64 (downcast when the frame is built).
+    """
+
+    def __init__(self, expected_rows: Optional[int] = None):
+        self.size = 0
+        capacity = expected_rows or STREAM_CHUNK_ROWS
+        self.columns = {
+            "Area": np.empty(capacity, dtype="int32"),
+            "Year": np.empty(capacity, dtype=YEAR_DTYPE),
+            **{column: np.empty(capacity, dtype="float64") for column in MEASURE_COLUMNS},
+        }
+        self.area_codes: Dict[str, int] = {}
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        # Same cleanup as the whole-frame path, on one chunk
+        year = pd.to_numeric(chunk["Year"], errors="coerce")
+        keep = (year.notna() & chunk["Area"].notna()).to_numpy()
+        if not keep.any():
+            return
+
+        _check_years(year[keep])
+        area = chunk["Area"][keep].astype(str).str.strip()
+        local_codes, uniques = pd.factorize(area)
+        lookup = np.array(
+            [self.area_codes.setdefault(name, len(self.area_codes)) for name in uniques],
+            dtype="int32",
+        )
+        values = {
+            "Area": lookup[local_codes],
+            "Year": year[keep].to_numpy(dtype="float64").astype(YEAR_DTYPE),
+            **{
+                column: pd.to_numeric(chunk[column][keep], errors="coerce").to_numpy(
+                    dtype="float64", na_value=np.nan
+                )
+                for column in MEASURE_COLUMNS
+            },
+        }
+
+        count = len(area)
+        self._reserve(self.size + count)
+        for name, array in values.items():
+            self.columns[name][self.size : self.size + count] = array
+        self.size += count
+
+    def _reserve(self, needed: int) -> None:
+        capacity = len(self.columns["Area"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, array in self.columns.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[: self.size] = array[: self.size]
+            self.columns[name] = grown
+
+    def build(self) -> pd.DataFrame:
+        n = self.size
+        # Trim to the row count (copy only when over-allocated)
+        columns = {
+            name: array if len(array) == n else array[:n].copy() for name, array in self.columns.items()
+        }
+
+        names = np.array(list(self.area_codes), dtype=object)
+        order = np.argsort(names, kind="stable")
+        rank = np.empty(len(names), dtype="int32")
+        rank[order] = np.arange(len(names), dtype="int32")
+        area = pd.Categorical.from_codes(rank[columns["Area"]], categories=names[order].tolist())
+
+        return pd.DataFrame(
+            {
+                "Year": columns["Year"],
+                "Area": area,
+                **{
+                    column: _downcast_float(pd.Series(columns[column], name=column))
+                    for column in MEASURE_COLUMNS
+                },
+            }
+        )
+
+
+def _parse_frame(
+    file_path: Path, keep_extra_columns: bool = False, progress: Optional[ProgressCallback] = None
+) -> pd.DataFrame:
+    report_progress(progress, "reading")
+    suffix = file_path.suffix.lower()
+    if suffix == ".csv":
+        df = pd.read_csv(file_path)
+    elif suffix == ".parquet":
+        df = pd.read_parquet(file_path)
+    else:
+        df = pd.read_excel(file_path)
+    report_progress(progress, "validating", rows_parsed=len(df))
+
+    # Rename recognized columns; keep original names for extra unused ones
+    df.rename(columns=_map_headers(df.columns.tolist()), inplace=True)
+    _check_required(df.columns)
+
+    raw_mb = _memory_mb(df)
+    if not keep_extra_columns:
+        df = df[REQUIRED_COLUMNS]
+
+    # Cleanup and convert types
+    df = df.assign(
+        Year=pd.to_numeric(df["Year"], errors="coerce"),
+        **{column: pd.to_numeric(df[column], errors="coerce") for column in MEASURE_COLUMNS},
+    )
     df = df.dropna(subset=["Year", "Area"])
-    df["Area"] = df["Area"].astype(str).str.strip()
 
+    # Compact schema: sorted categories (the order DataRepository indexes by),
+    # small ints for years, float32 only when it loses nothing
+    _check_years(df["Year"])
+    area = df["Area"].astype(str).str.strip()
+    df = df.assign(
+        Area=area.astype(pd.CategoricalDtype(sorted(area.unique()))),
+        Year=df["Year"].astype(YEAR_DTYPE),
+        **{column: _downcast_float(df[column]) for column in MEASURE_COLUMNS},
+    ).reset_index(drop=True)
+
+    logger.info(
+        "Loaded %s: %d rows, %.2f MB as read -> %.2f MB compact",
+        file_path.name,
+        len(df),
+        raw_mb,
+        _memory_mb(df),
+    )
     return df
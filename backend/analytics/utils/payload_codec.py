@@ -0,0 +1,45 @@
+import hashlib
+import json
+import zlib
+from typing import Any, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+CODECS = ("zlib", "zstd")
+
+
+def canonical_json(payload: Any) -> bytes:
+    return json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def encode_payload(payload: Any, codec: str = "zlib") -> Tuple[str, str, bytes, int]:
+    """
+    Returns (sha256 digest, codec actually used, compressed bytes,
+    uncompressed size). zstd falls back to zlib when zstandard is missing.
+    """
+    raw = canonical_json(payload)
+    digest = hashlib.sha256(raw).hexdigest()
+    if codec == "zstd" and zstandard is not None:
+        data = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        codec = "zlib"
+        data = zlib.compress(raw, 6)
+    return digest, codec, data, len(raw)
+
+
+def decode_payload(codec: str, data: bytes) -> Any:
+    data = bytes(data)  # BinaryField may hand back a memoryview
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed payloads")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown payload codec: {codec}")
+    return json.loads(raw)
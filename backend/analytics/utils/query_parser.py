@@ -1,8 +1,10 @@
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 import pandas as pd
 
+from .area_matcher import AreaMatcher
+
 
 def _extract_years(text: str) -> List[int]:
     years = set()
@@ -28,29 +30,12 @@ def _detect_intent_type(text: str) -> str:
 
 
 def _extract_areas_from_text(text: str, df: pd.DataFrame) -> List[str]:
-    known_areas = sorted(df["Area"].dropna().unique().tolist(), key=len, reverse=True)
-    lowercase = text.lower()
-    matched = []
-    for area in known_areas:
-        if re.search(r"\b" + re.escape(area.lower()) + r"\b", lowercase):
-            matched.append(area)
-    # Fallback: if no explicit match and there is a word that matches exactly an Area
-    if not matched:
-        words = set(re.findall(r"[a-zA-Z]+(?:\s+[a-zA-Z]+)*", text))
-        for area in known_areas:
-            if area.lower() in {w.strip().lower() for w in words}:
-                matched.append(area)
-    # Deduplicate preserving order
-    seen = set()
-    ordered = []
-    for a in matched:
-        if a not in seen:
-            seen.add(a)
-            ordered.append(a)
-    return ordered
+    return AreaMatcher(df["Area"].dropna().unique().tolist()).match(text)
 
 
-def parse_query_intent(df: pd.DataFrame, query: str) -> Dict[str, Any]:
+def parse_query_intent(
+    df: pd.DataFrame, query: str, matcher: Optional[AreaMatcher] = None
+) -> Dict[str, Any]:
     text = query.strip()
     if not text:
         return {
@@ -63,7 +48,10 @@ def parse_query_intent(df: pd.DataFrame, query: str) -> Dict[str, Any]:
     intent_type = _detect_intent_type(text)
     years = _extract_years(text)
     last_n = _extract_last_n_years(text)
-    areas = _extract_areas_from_text(text, df)
+    if matcher is not None:
+        areas = matcher.match(text)
+    else:
+        areas = _extract_areas_from_text(text, df)
 
     return {
         "intent_type": intent_type,
@@ -0,0 +1,117 @@
+"""
+Memory-mapped, read-only DataFrames that several processes can share.
+
+A frame is written once as one .npy file per column plus a meta.json;
+every process then maps the files with numpy's mmap_mode="r", so the
+column buffers live in the OS page cache and are shared between workers
+instead of being deserialized into each one.
+
+Supported column types:
+- numpy numeric / bool / datetime columns (stored as-is)
+- nullable integer columns such as Int64 (values + mask)
+- categorical and object columns (stored as integer codes; restored as
+  category, with object values converted to str)
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+_MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def _column_file(directory: Path, index: int, part: str) -> Path:
+    return directory / f"col{index}.{part}.npy"
+
+
+def _map(path: Path) -> np.ndarray:
+    # Plain ndarray view over the read-only mapping (no copy, no memmap subclass)
+    return np.asarray(np.load(path, mmap_mode="r"))
+
+
+def write_shared_frame(df: pd.DataFrame, directory: Path) -> Path:
+    """
+    Write `df` to `directory` atomically. If another process already
+    published the same directory, its copy is kept.
+    """
+    directory = Path(directory)
+    if directory.exists():
+        return directory
+
+    tmp_dir = directory.with_name(f".{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    columns = []
+    try:
+        for index, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": str(name)}
+
+            if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+                if series.dtype == object:
+                    series = series.where(series.isna(), series.astype(str)).astype("category")
+                entry["kind"] = "category"
+                entry["categories"] = [str(c) for c in series.cat.categories]
+                np.save(_column_file(tmp_dir, index, "codes"), series.cat.codes.to_numpy())
+            elif isinstance(series.array, _MASKED_ARRAYS):
+                numpy_dtype = series.dtype.numpy_dtype
+                entry["kind"] = "masked"
+                entry["dtype"] = str(series.dtype)
+                np.save(
+                    _column_file(tmp_dir, index, "values"),
+                    series.to_numpy(dtype=numpy_dtype, na_value=numpy_dtype.type(0)),
+                )
+                np.save(_column_file(tmp_dir, index, "mask"), series.isna().to_numpy())
+            elif series.dtype.kind in "biufcmM":
+                entry["kind"] = "numpy"
+                np.save(_column_file(tmp_dir, index, "values"), series.to_numpy())
+            else:
+                raise TypeError(f"Column {name!r} has unsupported dtype {series.dtype}")
+
+            columns.append(entry)
+
+        meta = {"format": FORMAT_VERSION, "rows": int(df.shape[0]), "columns": columns}
+        (tmp_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Lost the race to another worker publishing the same snapshot
+            if not directory.exists():
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return directory
+
+
+def open_shared_frame(directory: Path) -> pd.DataFrame:
+    """Map a frame written by write_shared_frame without copying column data."""
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported shared frame format in {directory}")
+
+    data = {}
+    for index, entry in enumerate(meta["columns"]):
+        kind = entry["kind"]
+        if kind == "category":
+            codes = _map(_column_file(directory, index, "codes"))
+            data[entry["name"]] = pd.Categorical.from_codes(
+                codes, categories=entry["categories"], validate=False
+            )
+        elif kind == "masked":
+            values = _map(_column_file(directory, index, "values"))
+            mask = _map(_column_file(directory, index, "mask"))
+            array_type = pd.api.types.pandas_dtype(entry["dtype"]).construct_array_type()
+            data[entry["name"]] = array_type(values, mask, copy=False)
+        else:
+            data[entry["name"]] = _map(_column_file(directory, index, "values"))
+
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]), copy=False)
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations of named stages within one request.
+
+        timer = StageTimer()
+        with timer.stage("parse"):
+            ...
+        timer.server_timing()  # 'parse;dur=0.41, total;dur=0.52'
+
+    A stage entered more than once accumulates its durations.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tags: Dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def tag(self, **tags: Any) -> None:
+        self.tags.update(tags)
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Value for a Server-Timing header (durations in milliseconds)."""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def timed(timer: Optional[StageTimer], name: str):
+    """timer.stage(name), or a no-op when no timer is given."""
+    return timer.stage(name) if timer is not None else nullcontext()
@@ -1,20 +1,37 @@
-import os
+import json
 from datetime import datetime
 from pathlib import Path
 
 from django.conf import settings
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
-from .serializers import AnalyzeRequestSerializer, DatasetUploadSerializer, SearchHistorySerializer
+from .serializers import (
+    AnalyzeBatchRequestSerializer,
+    AnalyzeRequestSerializer,
+    DatasetUploadSerializer,
+    SearchHistorySerializer,
+)
+from .services.analysis import AnalysisError, analyze_query, build_response_data, load_snapshot
 from .services.data_repository import DataRepository
-from .services.ai_summarizer import AISummarizer
-from .utils.query_parser import parse_query_intent
-from .utils.analytics_core import analyze_intent
+from .services.ai_summarizer import AISummarizer, llm_circuit
+from .services.result_cache import get_result_cache
+from .services.history_export import EXPORT_FORMATS, csv_lines, encode_chunks, export_rows, jsonl_lines
+from .services.history_writer import get_history_writer
+from .services.ingestion import ingestion_jobs, start_ingestion_job
+from .services.jobs import run_in_background
+from .services.metrics import record_request_timing, registry as metrics_registry
+from .services.summary_jobs import start_summary_job, summary_jobs, wait_for_summary_job
+from .utils.timing import StageTimer
 from .models import SearchHistory
+from .pagination import InvalidPageParams, keyset_page, parse_page_params
+from .permissions import HasMetricsToken
 
 
 class HealthCheckView(APIView):
@@ -23,15 +40,21 @@ class HealthCheckView(APIView):
             df = DataRepository.get_dataframe()
             dataset_ok = not df.empty
             rows = int(df.shape[0]) if dataset_ok else 0
+            memory_bytes = int(df.memory_usage(deep=True).sum())
         except Exception:
             dataset_ok = False
             rows = 0
+            memory_bytes = 0
         return Response(
             {
                 "status": "ok",
                 "dataset_loaded": dataset_ok,
                 "dataset_path": DataRepository.get_current_path(),
                 "rows": rows,
+                "memory_bytes": memory_bytes,
+                "analyze_cache": get_result_cache().stats(),
+                "llm_circuit": llm_circuit.snapshot(),
+                "history_writer": get_history_writer().stats(),
             }
         )
 
@@ -42,10 +65,33 @@ class AnalyzeView(APIView):
     Body: { "query": "Analyze Wakad" }
 
     Now stores full chatbot response in DB for replay later.
+
+    Optional "summary_mode":
+      - "sync" (default): respond once the summary is written.
+      - "deferred": respond 202 with charts/table and a "summary_job" id;
+        the summary is generated in the background and fetched from
+        /api/analyze/summary/<job_id>/.
+      - "stream": text/event-stream with an "analysis" event (charts/table
+        and the "summary_job" id) followed by a "summary" event.
+
+    Deferred and streamed summaries are generated in the background: the
+    history row is stored at once and gets its summary when the job ends.
+
+    Per-stage durations are returned in a Server-Timing header, logged as
+    JSON and, with METRICS_ENABLED, exported on /api/metrics/.
     """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        timer = StageTimer()
+        response = self._analyze(request, timer)
+        if settings.SERVER_TIMING_ENABLED:
+            response["Server-Timing"] = timer.server_timing()
+        record_request_timing("analyze", timer, response.status_code)
+        return response
+
+    def _analyze(self, request, timer):
+        requested_at = timezone.now()
         serializer = AnalyzeRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(
@@ -61,142 +107,335 @@ class AnalyzeView(APIView):
             )
 
         query = serializer.validated_data["query"].strip()
+        table_format = serializer.validated_data["table_format"]
+        summary_mode = serializer.validated_data["summary_mode"]
+        timer.tag(summary_mode=summary_mode)
 
         try:
-            df = DataRepository.get_dataframe()
-        except FileNotFoundError:
+            snapshot = load_snapshot(timer)
+            analysis = analyze_query(snapshot, query, table_format, timer)
+        except AnalysisError as e:
+            return Response({"success": False, "error": e.as_dict()}, status=e.http_status)
+
+        result = analysis.result
+        intent = analysis.intent
+        insights = result["insights"]
+        user_id = request.user.id
+
+        # Build full response payload (this gets stored + returned)
+        response_data = build_response_data(analysis, result["summary"])
+
+        if summary_mode in ("stream", "deferred") and result["summary"] is None:
+            # The summary outlives this request: the history row is written
+            # now and filled in by the background job, even if the client
+            # disconnects from the stream.
+            with timer.stage("history"):
+                complete = _completion(user_id, [analysis], requested_at, insert_now=True)
+            with timer.stage("summary"):
+                job = start_summary_job(user_id, query, intent, insights, on_complete=complete)
+            if summary_mode == "stream":
+                events = _stream_analysis(
+                    {**response_data, "summary_job": job["id"]}, _stream_summary_job(job["id"])
+                )
+                return _event_stream(events)
+            data = {**response_data, "summary_status": "pending", "summary_job": job["id"]}
+            return Response({"success": True, "data": data}, status=status.HTTP_202_ACCEPTED)
+
+        with timer.stage("summary"):
+            summary_text = result["summary"]
+            if summary_text is None:
+                summary_text = AISummarizer().summarize(query, intent, insights)
+        with timer.stage("history"):
+            _completion(user_id, [analysis], requested_at)(summary_text)
+        if summary_mode == "stream":
+            summary_events = [_sse("summary", {"summary": summary_text})]
+            return _event_stream(_stream_analysis(response_data, summary_events))
+        data = {**response_data, "summary": summary_text}
+        if summary_mode == "deferred":
+            data["summary_status"] = "done"
+
+        return Response({"success": True, "data": data}, status=status.HTTP_200_OK)
+
+
+class AnalyzeBatchView(APIView):
+    """
+    POST /api/analyze/batch/
+    Body: { "queries": ["Analyze Wakad", "Compare Aundh and Baner", ...] }
+
+    Runs every query against one dataset snapshot and answers with one
+    result per query, in order: {"query", "success", "data"} or
+    {"query", "success": false, "error"}. Queries with the same intent
+    share one computation and one summary. History rows are written in
+    a single batch.
+
+    Optional "table_format" as for /api/analyze/, and "summary_mode":
+      - "sync" (default): summaries are generated concurrently before
+        responding.
+      - "deferred": each result carries a "summary_job" id instead.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        timer = StageTimer()
+        response = self._analyze_batch(request, timer)
+        if settings.SERVER_TIMING_ENABLED:
+            response["Server-Timing"] = timer.server_timing()
+        record_request_timing("analyze_batch", timer, response.status_code)
+        return response
+
+    def _analyze_batch(self, request, timer):
+        requested_at = timezone.now()
+        serializer = AnalyzeBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
                 {
                     "success": False,
                     "error": {
-                        "code": "DATASET_NOT_FOUND",
+                        "code": "INVALID_REQUEST",
                         "message": (
-                            "Dataset file is missing. Please upload a new Excel file "
-                            "or configure DEFAULT_DATASET_PATH correctly."
+                            f"Please provide a list of 1 to {settings.ANALYZE_BATCH_MAX_QUERIES} queries."
                         ),
+                        "details": serializer.errors,
                     },
                 },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-        except ValueError as e:
-            return Response(
-                {
-                    "success": False,
-                    "error": {
-                        "code": "DATASET_INVALID",
-                        "message": str(e),
-                    },
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-        except Exception as e:
-            return Response(
-                {
-                    "success": False,
-                    "error": {
-                        "code": "DATASET_ERROR",
-                        "message": f"Unexpected error when loading dataset: {e}",
-                    },
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if df.empty:
-            return Response(
-                {
-                    "success": False,
-                    "error": {
-                        "code": "EMPTY_DATASET",
-                        "message": "The current dataset has no records.",
-                    },
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        queries = [q.strip() for q in serializer.validated_data["queries"]]
+        table_format = serializer.validated_data["table_format"]
+        summary_mode = serializer.validated_data["summary_mode"]
+        timer.tag(summary_mode=summary_mode, queries=len(queries))
 
-        intent = parse_query_intent(df, query)
+        try:
+            snapshot = load_snapshot(timer)
+        except AnalysisError as e:
+            return Response({"success": False, "error": e.as_dict()}, status=e.http_status)
+
+        # Analyze every query; identical intents share one result (memo)
+        memo = {}
+        outcomes = []
+        groups = {}  # cache_key -> analyses sharing that result
+        for query in queries:
+            try:
+                analysis = analyze_query(snapshot, query, table_format, timer, memo=memo)
+            except AnalysisError as e:
+                outcomes.append(e)
+                continue
+            outcomes.append(analysis)
+            groups.setdefault(analysis.cache_key, []).append(analysis)
+
+        user_id = request.user.id
+        summaries = {}
+        jobs = {}
+        history = []
+        with timer.stage("summary"):
+            pending = {}
+            for cache_key, members in groups.items():
+                first = members[0]
+                if first.result["summary"] is not None:
+                    summaries[cache_key] = first.result["summary"]
+                    history.extend(
+                        _history_records(user_id, members, summaries[cache_key], requested_at)
+                    )
+                elif summary_mode == "deferred":
+                    jobs[cache_key] = start_summary_job(
+                        user_id,
+                        first.query,
+                        first.intent,
+                        first.result["insights"],
+                        on_complete=_completion(user_id, members, requested_at, insert_now=True),
+                    )
+                else:
+                    pending[cache_key] = run_in_background(
+                        "summary",
+                        settings.SUMMARY_WORKERS,
+                        AISummarizer().summarize,
+                        first.query,
+                        first.intent,
+                        first.result["insights"],
+                    )
+
+            result_cache = get_result_cache()
+            for cache_key, future in pending.items():
+                members = groups[cache_key]
+                summaries[cache_key] = future.result()
+                if result_cache.enabled:
+                    result_cache.set(cache_key, {**members[0].result, "summary": summaries[cache_key]})
+                history.extend(
+                    _history_records(user_id, members, summaries[cache_key], requested_at)
+                )
+
+        with timer.stage("history"):
+            get_history_writer().save_many(history)
+
+        results = []
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, AnalysisError):
+                results.append({"query": query, "success": False, "error": outcome.as_dict()})
+                continue
+            data = build_response_data(outcome, summaries.get(outcome.cache_key))
+            if summary_mode == "deferred":
+                job = jobs.get(outcome.cache_key)
+                data["summary_status"] = "pending" if job else "done"
+                if job:
+                    data["summary_job"] = job["id"]
+            results.append({"query": query, "success": True, "data": data})
+
+        return Response({"success": True, "data": {"results": results}}, status=status.HTTP_200_OK)
+
+
+def _history_records(user_id, analyses, summary_text, requested_at):
+    """SearchHistory records dated at the request, however late the writer inserts them."""
+    records = []
+    for analysis in analyses:
+        insights = analysis.result["insights"]
+        years = insights.get("years", [])
+        time_window = ""
+        if years:
+            time_window = f"{min(years)} - {max(years)}"
 
-        if intent.get("intent_type") == "invalid":
-            return Response(
+        records.append(
+            (
+                build_response_data(analysis, summary_text),  # <-- full chatbot memory stored here
                 {
-                    "success": False,
-                    "error": {
-                        "code": "INVALID_QUERY",
-                        "message": "Your query seems empty or invalid. Please try again.",
-                    },
+                    "user_id": user_id,
+                    "query": analysis.query,
+                    "summary": summary_text,
+                    "intent_type": analysis.intent.get("intent_type", ""),
+                    "areas": ", ".join(insights.get("areas", [])),
+                    "time_window": time_window,
+                    "created_at": requested_at,
                 },
-                status=status.HTTP_400_BAD_REQUEST,
             )
+        )
+    return records
 
-        areas = intent.get("areas") or []
-        if not areas:
+
+def _completion(user_id, analyses, requested_at, insert_now=False):
+    """
+    Callback run once the summary for `analyses` (queries sharing one
+    result) is known: caches the summarized result and queues the
+    history rows for the background batch writer (HISTORY_WRITER_MODE).
+
+    With insert_now the rows are inserted immediately with no summary and
+    the callback only fills them in, so history survives a summary job
+    that fails or a client that goes away.
+    """
+    writer = get_history_writer()
+    row_ids = None
+    if insert_now:
+        row_ids = writer.insert(_history_records(user_id, analyses, None, requested_at))
+
+    def complete(summary_text):
+        first = analyses[0]
+        result_cache = get_result_cache()
+        if first.result["summary"] is None and result_cache.enabled:
+            result_cache.set(first.cache_key, {**first.result, "summary": summary_text})
+        records = _history_records(user_id, analyses, summary_text, requested_at)
+        if row_ids is None:
+            writer.save_many(records)
+        else:
+            writer.complete(row_ids, records)
+
+    return complete
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx flush each event
+    return response
+
+
+def _stream_analysis(full_response, summary_events):
+    """SSE: charts and table first, then the summary (or error) events."""
+    yield _sse("analysis", {**full_response, "summary": None})
+    yield from summary_events
+    yield _sse("done", {"success": True})
+
+
+class MetricsView(APIView):
+    """
+    GET /api/metrics/
+    Prometheus text format histograms for this worker process.
+    Returns 404 unless METRICS_ENABLED is set. Readable by admins and by
+    scrapers sending an X-Metrics-Token header equal to METRICS_TOKEN.
+    """
+    permission_classes = [HasMetricsToken | IsAdminUser]
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
             return Response(
-                {
-                    "success": False,
-                    "error": {
-                        "code": "UNKNOWN_LOCALITY",
-                        "message": (
-                            "I could not find any matching locality in the dataset. "
-                            "Please check the spelling or try another area."
-                        ),
-                    },
-                },
-                status=status.HTTP_200_OK,
+                {"success": False, "error": {"code": "NOT_FOUND", "message": "Metrics are disabled."}},
+                status=status.HTTP_404_NOT_FOUND,
             )
+        return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-        analysis = analyze_intent(df, intent)
 
-        if not analysis["table"]["rows"]:
+class AnalyzeSummaryView(APIView):
+    """
+    GET /api/analyze/summary/<job_id>/
+    Status of a summary started with summary_mode="deferred".
+    Add ?stream=1 to wait for it as a text/event-stream instead of polling.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = summary_jobs.get(job_id)
+        if job is None or job.get("user_id") != request.user.id:
             return Response(
                 {
                     "success": False,
                     "error": {
-                        "code": "NO_DATA_FOR_FILTER",
-                        "message": (
-                            "I found the locality, but there is no data matching "
-                            "the specified time window or filters."
-                        ),
+                        "code": "SUMMARY_JOB_NOT_FOUND",
+                        "message": "This summary is unknown or has expired.",
                     },
                 },
-                status=status.HTTP_200_OK,
+                status=status.HTTP_404_NOT_FOUND,
             )
 
-        summarizer = AISummarizer()
-        summary_text = summarizer.summarize(query, intent, analysis["insights"])
+        if _flag(request.query_params.get("stream")):
+            return _event_stream(_stream_summary_job(job_id))
 
-        # Build full response payload (this gets stored + returned)
-        full_response = {
-            "query": query,
-            "intent": intent,
-            "summary": summary_text,
-            "charts": analysis["charts"],
-            "table": analysis["table"],
-        }
-
-        # Save user-specific full history
-        user = request.user
-        years = analysis["insights"].get("years", [])
-        time_window = ""
-        if years:
-            time_window = f"{min(years)} - {max(years)}"
-
-        SearchHistory.objects.create(
-            user=user,
-            query=query,
-            summary=summary_text,
-            full_response=full_response,  # <-- full chatbot memory stored here
-            intent_type=intent.get("intent_type", ""),
-            areas=", ".join(analysis["insights"].get("areas", [])),
-            time_window=time_window,
+        return Response(
+            {
+                "success": True,
+                "job": {
+                    "id": job["id"],
+                    "status": job["status"],
+                    "summary": job.get("summary"),
+                },
+            }
         )
 
-        return Response({"success": True, "data": full_response}, status=status.HTTP_200_OK)
+
+def _stream_summary_job(job_id):
+    for job in wait_for_summary_job(job_id, timeout=settings.SUMMARY_STREAM_TIMEOUT_SECONDS):
+        if job is None:
+            yield ": keep-alive\n\n"
+        elif job["status"] == "done":
+            yield _sse("summary", {"summary": job["summary"]})
+            return
+        else:
+            yield _sse("error", {"code": "SUMMARY_FAILED", "message": job.get("error", "")})
+            return
+    yield _sse("error", {"code": "SUMMARY_TIMEOUT", "message": "Summary is not ready yet."})
 
 
 class DatasetUploadView(APIView):
     """
     POST /api/dataset/upload/
-    Form-data: file=<Excel>
+    Form-data: file=<.xlsx, .xls, .csv or .parquet>, mode=replace|append|upsert
     Only admins can upload.
+
+    The file is stored and handed to a background ingestion job; the
+    response is 202 with the job, whose progress is polled from
+    /api/dataset/jobs/<job_id>/. The dataset is activated when the job
+    finishes successfully.
     """
     permission_classes = [IsAuthenticated]
 
@@ -207,14 +446,14 @@ class DatasetUploadView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        serializer = DatasetUploadSerializer(data=request.data, files=request.FILES)
+        serializer = DatasetUploadSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(
                 {
                     "success": False,
                     "error": {
                         "code": "INVALID_UPLOAD",
-                        "message": "Please upload a valid Excel file.",
+                        "message": "Please upload a valid dataset file (.xlsx, .xls, .csv or .parquet).",
                         "details": serializer.errors,
                     },
                 },
@@ -233,60 +472,154 @@ class DatasetUploadView(APIView):
             for chunk in file.chunks():
                 dest.write(chunk)
 
-        try:
-            df = DataRepository.replace_with_file(str(dest_path))
-        except Exception as e:
-            try:
-                os.remove(dest_path)
-            except OSError:
-                pass
+        job = start_ingestion_job(
+            request.user.id, str(dest_path), file.name, serializer.validated_data["mode"]
+        )
+
+        return Response(
+            {
+                "success": True,
+                "message": "Dataset uploaded; it will be activated once processing finishes.",
+                "job": _ingestion_job_data(job),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class DatasetJobView(APIView):
+    """
+    GET /api/dataset/jobs/<job_id>/
+    Progress of a dataset upload: status pending|running|done|failed,
+    the current stage and row counts.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        if not request.user.is_admin():
+            return Response(
+                {"success": False, "message": "Only admins can view dataset uploads."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        job = ingestion_jobs.get(job_id)
+        if job is None:
             return Response(
                 {
                     "success": False,
                     "error": {
-                        "code": "DATASET_UPLOAD_FAILED",
-                        "message": f"Failed to load uploaded dataset: {e}",
+                        "code": "INGESTION_JOB_NOT_FOUND",
+                        "message": "This upload is unknown or has expired.",
                     },
                 },
-                status=status.HTTP_400_BAD_REQUEST,
+                status=status.HTTP_404_NOT_FOUND,
             )
 
+        return Response({"success": True, "job": _ingestion_job_data(job)})
+
+
+def _ingestion_job_data(job):
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "file_name": job.get("file_name"),
+        "mode": job.get("mode"),
+        "rows_parsed": job.get("rows_parsed"),
+        "rows_loaded": job.get("rows_loaded"),
+        "columns": job.get("columns"),
+        "error": job.get("error"),
+    }
+
+
+def _history_page(request, qs, key):
+    """Keyset-paginated history response (?cursor=&page_size=)."""
+    try:
+        cursor, page_size = parse_page_params(request.query_params)
+        rows, next_cursor = keyset_page(qs.select_related("payload"), cursor, page_size)
+    except InvalidPageParams as e:
         return Response(
             {
-                "success": True,
-                "message": "Dataset uploaded and activated successfully.",
-                "rows_loaded": int(df.shape[0]),
-                "columns": list(df.columns),
+                "success": False,
+                "error": {"code": "INVALID_PAGE", "message": str(e)},
             },
-            status=status.HTTP_200_OK,
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
+    serializer = SearchHistorySerializer(rows, many=True)
+    return Response(
+        {
+            "success": True,
+            key: serializer.data,
+            "next_cursor": next_cursor,
+            "page_size": page_size,
+        }
+    )
+
 
 class MyHistoryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        qs = SearchHistory.objects.filter(user=request.user).order_by("-created_at")
-        serializer = SearchHistorySerializer(qs, many=True)
-        return Response({"success": True, "history": serializer.data})
+        qs = SearchHistory.objects.filter(user=request.user)
+        return _history_page(request, qs, "history")
 
 
 class AdminUserHistoryView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request, user_id):
-        qs = SearchHistory.objects.filter(user_id=user_id).order_by("-created_at")
-        serializer = SearchHistorySerializer(qs, many=True)
-        return Response({"success": True, "history": serializer.data})
+        qs = SearchHistory.objects.filter(user_id=user_id)
+        return _history_page(request, qs, "history")
     
 class ExportAllHistoryView(APIView):
     """
     Admin only: returns all stored conversations in raw JSON for export purposes.
+    Paginated like the history endpoints; follow next_cursor for the rest.
+
+    ?export_format=jsonl|csv streams the whole table as a file download
+    in constant memory instead. Options: gzip=1 compresses on the fly,
+    include_full_response=1 adds the stored charts/table payload.
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        qs = SearchHistory.objects.all().order_by("-created_at")
-        serializer = SearchHistorySerializer(qs, many=True)
-        return Response({"success": True, "export": serializer.data})
+        qs = SearchHistory.objects.all()
+        export_format = request.query_params.get("export_format")
+        if not export_format:
+            return _history_page(request, qs, "export")
+
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {
+                    "success": False,
+                    "error": {
+                        "code": "INVALID_EXPORT_FORMAT",
+                        "message": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}.",
+                    },
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        include_full_response = _flag(request.query_params.get("include_full_response"))
+        use_gzip = _flag(request.query_params.get("gzip"))
+
+        rows = export_rows(qs, include_full_response, chunk_size=settings.EXPORT_CHUNK_SIZE)
+        if export_format == "csv":
+            lines = csv_lines(rows, include_full_response)
+            content_type = "text/csv; charset=utf-8"
+        else:
+            lines = jsonl_lines(rows)
+            content_type = "application/x-ndjson; charset=utf-8"
+
+        filename = f"history_export_{datetime.utcnow():%Y%m%d%H%M%S}.{export_format}"
+        if use_gzip:
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(encode_chunks(lines, gzip=use_gzip), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
 
+def _flag(value):
+    return (value or "").lower() in ("1", "true", "yes")
@@ -0,0 +1,224 @@
+"""
+Stage timings for the /api/analyze/ pipeline at several dataset scales.
+
+For every scale a synthetic workbook (benchmarks.synthetic) is written to
+a temporary directory and these stages are timed:
+
+    load_parse      load_dataset_from_path, cold (Excel parse)
+    load_cached     load_dataset_from_path from its Parquet sidecar
+    build_derived   sort + area index, AreaMatcher, Area x Year cube
+    parse_intent    parse_query_intent, per query
+    analyze         analyze_intent, per query
+    analyze_view    POST /api/analyze/ end to end, per request
+
+Results are printed as JSON (and optionally written with --output) so runs
+can be diffed or tracked over time. The view stage runs against a
+throwaway test database with the result cache and LLM disabled.
+
+    cd backend
+    python -m benchmarks.analyze_pipeline
+    python -m benchmarks.analyze_pipeline --scales small medium --repeat 3 --output bench.json
+    python -m benchmarks.analyze_pipeline --custom 300 12 4
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# (localities, years, rows per locality and year)
+SCALES = {
+    "small": (20, 5, 1),
+    "medium": (200, 10, 2),
+    "large": (1000, 15, 4),
+}
+
+
+def _setup_django(workdir: Path) -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "real_estate_analytics.settings")
+    # Measure the pipeline itself: no cached results, no network LLM calls
+    os.environ["ANALYZE_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["ANALYZE_CACHE_BACKEND"] = ""
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ["DATASET_CACHE_DIR"] = ""
+    os.environ["DATASET_SHARED_MEMORY"] = "false"
+    os.environ["DATASET_REGISTRY_PATH"] = str(workdir / "active_dataset.json")
+    os.environ.setdefault("HISTORY_WRITER_MODE", "sync")
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(samples),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+    }
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _queries(areas: List[str], first_year: int, years: int) -> List[str]:
+    a, b, c = (areas * 3)[:3]
+    last = first_year + years - 1
+    return [
+        f"Analyze {a}",
+        f"Compare {a} and {b}",
+        f"Show price growth for {c} over the last 3 years",
+        f"Compare {a}, {b} and {c} demand between {first_year} and {last}",
+        f"How has {b} changed in {last}?",
+    ]
+
+
+def run_scale(name: str, localities: int, years: int, rows: int, repeat: int, workdir: Path, client) -> Dict:
+    from analytics.services.data_repository import DataRepository
+    from analytics.utils.analytics_core import (
+        analyze_intent,
+        build_area_index,
+        build_area_year_cube,
+        sort_by_area_year,
+    )
+    from analytics.utils.area_matcher import AreaMatcher
+    from analytics.utils.data_loader import load_dataset_from_path
+    from analytics.utils.query_parser import parse_query_intent
+
+    from .synthetic import generate_dataset, write_dataset
+
+    path = write_dataset(generate_dataset(localities, years, rows), workdir / f"{name}.xlsx")
+    cache_dir = workdir / f"{name}-cache"
+
+    stages = {}
+    stages["load_parse"] = _time(lambda: load_dataset_from_path(str(path)), repeat)
+    load_dataset_from_path(str(path), cache_dir=str(cache_dir))  # populate the sidecar
+    stages["load_cached"] = _time(lambda: load_dataset_from_path(str(path), cache_dir=str(cache_dir)), repeat)
+
+    raw = load_dataset_from_path(str(path))
+    areas = raw["Area"].dropna().unique().tolist()
+
+    def build_derived():
+        ordered = sort_by_area_year(raw)
+        return build_area_index(ordered), AreaMatcher(areas), build_area_year_cube(ordered)
+
+    stages["build_derived"] = _time(build_derived, repeat)
+
+    df = sort_by_area_year(raw)
+    area_index, matcher, cube = build_derived()
+    queries = _queries(areas, int(df["Year"].min()), years)
+
+    parse_samples, analyze_samples, view_samples = [], [], []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            intent = parse_query_intent(df, query, matcher=matcher)
+            parse_samples.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            analyze_intent(df, intent, cube=cube, area_index=area_index)
+            analyze_samples.append(time.perf_counter() - started)
+    stages["parse_intent"] = parse_samples
+    stages["analyze"] = analyze_samples
+
+    DataRepository.replace_with_file(str(path))
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            response = client.post("/api/analyze/", {"query": query}, format="json")
+            view_samples.append(time.perf_counter() - started)
+            # Errors such as UNKNOWN_LOCALITY also come back as 200; only time real analyses
+            if response.status_code != 200 or not response.json().get("success"):
+                raise RuntimeError(f"{query!r} returned {response.status_code}: {response.content[:200]!r}")
+    stages["analyze_view"] = view_samples
+
+    return {
+        "scale": name,
+        "localities": localities,
+        "years": years,
+        "rows_per_year": rows,
+        "rows": int(df.shape[0]),
+        "file_bytes": path.stat().st_size,
+        "frame_bytes": int(df.memory_usage(deep=True).sum()),
+        "stages": {stage: _stats(samples) for stage, samples in stages.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["small", "medium", "large"])
+    parser.add_argument(
+        "--custom",
+        nargs=3,
+        type=int,
+        metavar=("LOCALITIES", "YEARS", "ROWS"),
+        help="run a custom scale instead of --scales",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results to this file as well")
+    args = parser.parse_args(argv)
+
+    scales = {"custom": tuple(args.custom)} if args.custom else {name: SCALES[name] for name in args.scales}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        _setup_django(workdir)
+
+        import numpy
+        import pandas
+        from accounts.models import User
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("bench", password="bench-pass"))
+
+        results = []
+        for name, (localities, years, rows) in scales.items():
+            result = run_scale(name, localities, years, rows, args.repeat, workdir, client)
+            results.append(result)
+            print(
+                f"{name:<8} {result['rows']:>8} rows  "
+                + "  ".join(f"{stage} {s['median_ms']:.2f}ms" for stage, s in result["stages"].items()),
+                file=sys.stderr,
+            )
+
+    report = {
+        "benchmark": "analyze_pipeline",
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrent SearchHistory write/read throughput under each DB_PROFILE.
+
+Every profile gets a fresh SQLite file (migrated with manage.py). A pool
+of worker processes, standing in for gunicorn workers, then loops over
+"insert one history row, read the newest history page" through the
+Django ORM. Throughput, latency percentiles and "database is locked"
+errors are reported per profile.
+
+    cd backend
+    python -m benchmarks.sqlite_concurrency --workers 8 --ops 300
+    python -m benchmarks.sqlite_concurrency --profiles default production --output sqlite.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _setup_django():
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "real_estate_analytics.settings")
+    import django
+
+    django.setup()
+
+
+def _worker(args):
+    """Runs in a child process; env (DB_PROFILE, SQLITE_PATH) is inherited."""
+    worker_id, ops, user_id = args
+    _setup_django()
+    from django.db import OperationalError, connections
+
+    from analytics.models import SearchHistory
+
+    latencies = []
+    errors = 0
+    for i in range(ops):
+        started = time.perf_counter()
+        try:
+            SearchHistory.objects.create(
+                user_id=user_id,
+                query=f"worker {worker_id} query {i}",
+                summary="benchmark",
+                intent_type="single_area",
+                areas="Wakad",
+                time_window="2020 - 2024",
+            )
+            list(SearchHistory.objects.filter(user_id=user_id).order_by("-created_at", "-id")[:50])
+        except OperationalError:
+            errors += 1
+            continue
+        finally:
+            # Without persistent connections Django closes after each request
+            connections["default"].close_if_unusable_or_obsolete()
+        latencies.append(time.perf_counter() - started)
+    connections.close_all()
+    return latencies, errors
+
+
+def run_profile(profile: str, workers: int, ops: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DB_PROFILE": profile, "SQLITE_PATH": str(Path(tmp) / "bench.sqlite3")}
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "-v", "0"],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+        )
+        user_id = int(
+            subprocess.run(
+                [
+                    sys.executable,
+                    "manage.py",
+                    "shell",
+                    "-c",
+                    "from accounts.models import User; "
+                    "print(User.objects.create_user('bench', password='bench-pass').id)",
+                ],
+                cwd=BACKEND_DIR,
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        )
+
+        saved_env = dict(os.environ)
+        os.environ.update(env)
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(workers) as pool:
+                started = time.perf_counter()
+                results = pool.map(_worker, [(w, ops, user_id) for w in range(workers)])
+                elapsed = time.perf_counter() - started
+        finally:
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+    latencies = [lat for worker_latencies, _ in results for lat in worker_latencies]
+    errors = sum(worker_errors for _, worker_errors in results)
+    return {
+        "profile": profile,
+        "workers": workers,
+        "ops_per_worker": ops,
+        "completed": len(latencies),
+        "locked_errors": errors,
+        "seconds": round(elapsed, 3),
+        "ops_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="write+read iterations per worker")
+    parser.add_argument("--output", help="write JSON results to this file as well")
+    args = parser.parse_args(argv)
+
+    results = []
+    for profile in args.profiles:
+        result = run_profile(profile, args.workers, args.ops)
+        results.append(result)
+        print(
+            f"{profile:<12} {result['ops_per_second']:>9.1f} ops/s  "
+            f"p95 {result['p95_ms']:>8.2f} ms  locked errors {result['locked_errors']}",
+            file=sys.stderr,
+        )
+
+    report = {"benchmark": "sqlite_concurrency", "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Synthetic datasets shaped like the real workbook.
+
+Headers are the source names from analytics.utils.data_loader.COLUMN_MAPPING
+(plus a few unmapped columns like the real sheet has), so generated files
+go through exactly the same parse/normalize path as an admin upload.
+
+    python -m benchmarks.synthetic --localities 500 --years 12 --rows 3 -o /tmp/synthetic.xlsx
+"""
+import argparse
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from analytics.utils.data_loader import COLUMN_MAPPING
+
+SOURCE_COLUMNS = {internal: source for source, internal in COLUMN_MAPPING.items()}
+
+_SYLLABLES = ["ba", "dha", "go", "ka", "le", "ma", "ni", "pu", "ra", "sho", "ta", "vi", "wa", "ya"]
+
+
+def locality_names(count: int) -> List[str]:
+    """`count` distinct, word-like locality names (deterministic)."""
+    names = []
+    base = len(_SYLLABLES)
+    for index in range(count):
+        parts = []
+        value = index
+        for _ in range(3):
+            parts.append(_SYLLABLES[value % base])
+            value //= base
+        name = "".join(parts).capitalize()
+        if value:
+            name = f"{name} {value + 1}"
+        names.append(name)
+    return names
+
+
+def generate_dataset(
+    localities: int = 50,
+    years: int = 10,
+    rows_per_year: int = 1,
+    first_year: int = 2010,
+    invalid_fraction: float = 0.01,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    One row per (locality, year, repeat) with a per-locality price trend.
+    About `invalid_fraction` of the rows get a missing year so the
+    loader's cleanup path is exercised too.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(locality_names(localities))
+    year_values = np.arange(first_year, first_year + years)
+
+    area = np.repeat(names, years * rows_per_year)
+    year = np.tile(np.repeat(year_values, rows_per_year), localities).astype(float)
+    n = area.size
+
+    base_price = np.repeat(rng.uniform(4000, 15000, localities), years * rows_per_year)
+    growth = np.repeat(rng.uniform(-0.02, 0.09, localities), years * rows_per_year)
+    price = base_price * (1 + growth) ** (year - first_year) * rng.normal(1.0, 0.04, n)
+    demand = rng.poisson(400, n)
+    size = demand * rng.uniform(500, 1100, n)
+
+    if invalid_fraction > 0:
+        year[rng.random(n) < invalid_fraction] = np.nan
+
+    return pd.DataFrame(
+        {
+            SOURCE_COLUMNS["Area"]: area,
+            SOURCE_COLUMNS["Year"]: year,
+            "city": "Pune",
+            "loc_lat": np.round(rng.uniform(18.4, 18.7, n), 6),
+            "loc_lng": np.round(rng.uniform(73.7, 74.0, n), 6),
+            SOURCE_COLUMNS["Demand"]: demand,
+            SOURCE_COLUMNS["Price"]: np.round(price, 6),
+            "total units": demand + rng.poisson(80, n),
+            SOURCE_COLUMNS["Size"]: np.round(size, 5),
+        }
+    )
+
+
+def write_dataset(df: pd.DataFrame, path: Path) -> Path:
+    """Write as .xlsx, .csv or .parquet depending on the suffix."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    elif path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--localities", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=1, help="rows per locality and year")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True, help=".xlsx, .csv or .parquet")
+    args = parser.parse_args(argv)
+
+    df = generate_dataset(args.localities, args.years, args.rows, seed=args.seed)
+    print(write_dataset(df, args.output), f"({len(df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -63,10 +63,31 @@ WSGI_APPLICATION = "real_estate_analytics.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.getenv("SQLITE_PATH") or BASE_DIR / "db.sqlite3",
     }
 }
 
+# DB_PROFILE=production tunes SQLite for concurrent workers: WAL journal
+# (readers don't block the writer), synchronous=NORMAL (safe with WAL), a
+# busy timeout instead of immediate "database is locked", a memory-mapped
+# read path and persistent connections. The PRAGMAs are applied to every
+# new connection by analytics.db.configure_sqlite.
+DB_PROFILE = os.getenv("DB_PROFILE", "default").strip().lower()
+SQLITE_PRAGMAS = {}
+if DB_PROFILE == "production":
+    SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "5"))
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("SQLITE_CONN_MAX_AGE", "600"))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["default"]["OPTIONS"] = {"timeout": SQLITE_BUSY_TIMEOUT_SECONDS}
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(SQLITE_BUSY_TIMEOUT_SECONDS * 1000),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "temp_store": "MEMORY",
+        "cache_size": -int(os.getenv("SQLITE_CACHE_KB", "20000")),
+    }
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
@@ -80,6 +101,10 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Private runtime state (dataset and job caches, the dataset registry). Kept
+# out of MEDIA_ROOT: it must never be served, and the job cache holds pickles.
+VAR_DIR = Path(os.getenv("VAR_DIR", str(BASE_DIR / "var")))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "accounts.User"
@@ -109,6 +134,109 @@ DEFAULT_DATASET_PATH = os.getenv(
     "DEFAULT_DATASET_PATH",
     str(BASE_DIR / "data" / "real_estate_data.xlsx"),
 )
+# Parquet sidecars of normalized datasets (set to "" to disable)
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", str(VAR_DIR / "dataset_cache"))
+
+# Keep unmapped workbook columns in memory (dropped by default)
+DATASET_KEEP_EXTRA_COLUMNS = os.getenv("DATASET_KEEP_EXTRA_COLUMNS", "False").lower() == "true"
+
+# Share one memory-mapped copy of the dataset between worker processes
+DATASET_SHARED_MEMORY = os.getenv("DATASET_SHARED_MEMORY", "False").lower() == "true"
+DATASET_SHARED_DIR = os.getenv("DATASET_SHARED_DIR", str(VAR_DIR / "dataset_shared"))
+
+# Active-dataset registry shared by all workers, polled at most this often
+DATASET_REGISTRY_PATH = os.getenv(
+    "DATASET_REGISTRY_PATH",
+    str(VAR_DIR / "datasets" / "active.json"),
+)
+DATASET_VERSION_CHECK_SECONDS = float(os.getenv("DATASET_VERSION_CHECK_SECONDS", "2"))
+
+# /api/analyze/ result cache: in-process LRU (0 entries disables it), plus an
+# optional shared tier naming one of settings.CACHES
+ANALYZE_CACHE_MAX_ENTRIES = int(os.getenv("ANALYZE_CACHE_MAX_ENTRIES", "256"))
+ANALYZE_CACHE_TTL_SECONDS = float(os.getenv("ANALYZE_CACHE_TTL_SECONDS", "600"))
+ANALYZE_CACHE_BACKEND = os.getenv("ANALYZE_CACHE_BACKEND", "").strip()
+
+# Upper bound on queries per POST /api/analyze/batch/
+ANALYZE_BATCH_MAX_QUERIES = int(os.getenv("ANALYZE_BATCH_MAX_QUERIES", "50"))
+
+# History endpoints are keyset-paginated (?cursor=&page_size=)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+# Admin user list (page-number pagination)
+USERS_PAGE_SIZE = int(os.getenv("USERS_PAGE_SIZE", "50"))
+USERS_MAX_PAGE_SIZE = int(os.getenv("USERS_MAX_PAGE_SIZE", "200"))
+# Compression for stored analyze responses: "zlib" or "zstd" (needs zstandard)
+HISTORY_PAYLOAD_CODEC = os.getenv("HISTORY_PAYLOAD_CODEC", "zlib").strip()
+# Unreferenced payloads are deleted (prune_payloads, user deletion) once this old
+HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS = float(os.getenv("HISTORY_PAYLOAD_GC_MIN_AGE_SECONDS", "3600"))
+# History rows are written by a background batch writer ("background") or
+# inline in the request ("sync"); batches flush by size or after FLUSH seconds
+HISTORY_WRITER_MODE = os.getenv("HISTORY_WRITER_MODE", "background").strip()
+HISTORY_WRITER_BATCH_SIZE = int(os.getenv("HISTORY_WRITER_BATCH_SIZE", "100"))
+HISTORY_WRITER_FLUSH_SECONDS = float(os.getenv("HISTORY_WRITER_FLUSH_SECONDS", "1.0"))
+HISTORY_WRITER_MAX_QUEUE = int(os.getenv("HISTORY_WRITER_MAX_QUEUE", "10000"))
+# Rows fetched per DB round trip by the streaming history export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
+OPENAI_SUMMARY_MODEL = os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini").strip()
+
+# Hard ceiling on LLM latency per summary; after N consecutive failures the
+# LLM is skipped (rule-based summary) and re-probed every RESET seconds
+OPENAI_SUMMARY_DEADLINE_SECONDS = float(os.getenv("OPENAI_SUMMARY_DEADLINE_SECONDS", "8"))
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("OPENAI_CIRCUIT_FAILURE_THRESHOLD", "3"))
+OPENAI_CIRCUIT_RESET_SECONDS = float(os.getenv("OPENAI_CIRCUIT_RESET_SECONDS", "30"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# Persistent LLM summary cache (0 entries disables it; TTL 0 = no expiry)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Per-stage timings of /api/analyze/: Server-Timing response header, and
+# Prometheus-style histograms on /api/metrics/ (per worker process)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "True").lower() == "true"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() == "true"
+# Shared secret for scrapers (X-Metrics-Token header); admins can always read metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+# "default" stays per process; "jobs" is a file cache shared by every worker
+# process on the host (point JOB_CACHE_ALIAS at e.g. Redis across hosts)
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "jobs": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("JOB_CACHE_DIR", str(VAR_DIR / "job_cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("JOB_CACHE_MAX_ENTRIES", "10000"))},
+    },
+}
+
+# Background jobs (deferred summaries, dataset uploads): status records live in this cache
+# alias; it must be shared so any worker can answer status polls
+JOB_CACHE_ALIAS = os.getenv("JOB_CACHE_ALIAS", "jobs")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+SUMMARY_STREAM_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_STREAM_TIMEOUT_SECONDS", "30"))
+# Dataset uploads are parsed and activated by this many background threads
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "").strip()
+
+# Request timings (analytics.services.metrics) and dataset loading progress
+# are logged by the "analytics" loggers
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        "analytics": {
+            "handlers": ["console"],
+            "level": os.getenv("ANALYTICS_LOG_LEVEL", "INFO").upper(),
+        },
+    },
+}
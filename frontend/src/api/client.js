@@ -26,34 +26,73 @@ export const analyzeQuery = async (query) => {
   return res.data;
 };
 
-export const uploadDataset = async (file) => {
+// mode: "replace" (default), "append" or "upsert" (new rows replace same Area + Year)
+export const uploadDataset = async (file, mode = "replace") => {
   const formData = new FormData();
   formData.append("file", file);
+  formData.append("mode", mode);
   const res = await api.post("/dataset/upload/", formData, {
     headers: { "Content-Type": "multipart/form-data" },
   });
   return res.data;
 };
 
-export const fetchMyHistory = async () => {
-  const res = await api.get("/history/my/");
-  return res.data;
+// Uploads are processed in the background: poll the job until it is done or failed
+export const waitForDatasetJob = async (jobId, intervalMs = 1000) => {
+  for (;;) {
+    const res = await api.get(`/dataset/jobs/${jobId}/`);
+    const job = res.data?.job;
+    if (!res.data?.success || job.status === "done" || job.status === "failed") {
+      return res.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
 };
 
-export const fetchUserHistoryAdmin = async (userId) => {
-  const res = await api.get(`/history/admin/${userId}/`);
+// History endpoints are cursor-paginated: pass `next_cursor` back to get the next page
+export const fetchMyHistory = async (cursor) => {
+  const res = await api.get("/history/my/", { params: cursor ? { cursor } : {} });
   return res.data;
 };
 
+// Follows next_cursor until the last page and merges `key` from every page
+const fetchAllPages = async (url, key) => {
+  let items = [];
+  let cursor = null;
+  do {
+    const res = await api.get(url, { params: cursor ? { cursor } : {} }).then((r) => r.data);
+    if (!res.success) return res;
+    items = items.concat(res[key]);
+    cursor = res.next_cursor;
+  } while (cursor);
+  return { success: true, [key]: items };
+};
+
+export const fetchUserHistoryAdmin = async (userId) =>
+  await fetchAllPages(`/history/admin/${userId}/`, "history");
+
 // Auth APIs
 export const registerUser = async (payload) => await api.post("/auth/register/", payload).then(res => res.data);
 export const loginUser = async (payload) => await api.post("/auth/login/", payload).then(res => res.data);
 export const fetchMe = async () => await api.get("/auth/me/").then(res => res.data);
 
-export const fetchAdminUsers = async () => await api.get("/auth/admin/users/").then(res => res.data);
+// Admin user list is page-numbered; collect every page for the panel
+export const fetchAdminUsers = async () => {
+  let users = [];
+  let page = 1;
+  let numPages = 1;
+  do {
+    const res = await api.get("/auth/admin/users/", { params: { page, page_size: 200 } }).then((r) => r.data);
+    if (!res.success) return res;
+    users = users.concat(res.users);
+    numPages = res.num_pages;
+    page += 1;
+  } while (page <= numPages);
+  return { success: true, users };
+};
 export const changeUserRole = async (userId, role, password) => await api.post(`/auth/admin/users/${userId}/role/`, { role, password }).then(res => res.data);
 export const deleteUserAdmin = async (userId, password) => await api.post(`/auth/admin/users/${userId}/delete/`, { password }).then(res => res.data);
 
-export const exportAllHistoryAdmin = async () => await api.get("/history/export-all/").then(res => res.data);
+export const exportAllHistoryAdmin = async () => await fetchAllPages("/history/export-all/", "export");
 
 export default api;
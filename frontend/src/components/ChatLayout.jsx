@@ -10,7 +10,9 @@ const ChatLayout = ({
   loading,
   error,
   clearError,
-  onDatasetUpload
+  onDatasetUpload,
+  uploadMode,
+  onUploadModeChange
 }) => {
   return (
     <div className="container py-4 chat-container">
@@ -23,12 +25,22 @@ const ChatLayout = ({
                 Ask about locality trends, demand, and price growth.
               </small>
             </div>
-            <div>
-              <label className="btn btn-outline-secondary btn-sm mb-0">
+            <div className="d-flex align-items-center gap-2">
+              <select
+                className="form-select form-select-sm"
+                value={uploadMode}
+                onChange={(e) => onUploadModeChange(e.target.value)}
+                title="How the uploaded file is combined with the current dataset"
+              >
+                <option value="replace">Replace</option>
+                <option value="append">Append rows</option>
+                <option value="upsert">Update Area + Year</option>
+              </select>
+              <label className="btn btn-outline-secondary btn-sm mb-0 text-nowrap">
                 Upload Dataset
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.xls,.csv,.parquet"
                   hidden
                   onChange={onDatasetUpload}
                 />
@@ -1,6 +1,6 @@
 import React, { useState, useContext } from "react";
 import ChatLayout from "../components/ChatLayout.jsx";
-import { analyzeQuery, uploadDataset } from "../api/client.js";
+import { analyzeQuery, uploadDataset, waitForDatasetJob } from "../api/client.js";
 import { AuthContext } from "../context/AuthContext";
 import { useChatHistory } from "../hooks/useChatHistory.js";
 
@@ -13,6 +13,7 @@ const ChatPage = () => {
 
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [uploadMode, setUploadMode] = useState("replace");
 
   const handleSend = async (text) => {
     setError("");
@@ -67,14 +68,16 @@ const ChatPage = () => {
     setLoading(true);
 
     try {
-      const res = await uploadDataset(file);
+      const upload = await uploadDataset(file, uploadMode);
+      const res = upload.success ? await waitForDatasetJob(upload.job.id) : upload;
+      const job = res?.job;
 
-      if (!res.success) {
-        setError(res?.error?.message || "Dataset upload failed.");
+      if (!res.success || job?.status === "failed") {
+        setError(job?.error || res?.error?.message || "Dataset upload failed.");
       } else {
         addBotMessage({
           type: "bot",
-          summary: `📁 Dataset uploaded successfully. Rows: ${res.rows_loaded}`,
+          summary: `📁 Dataset uploaded successfully. Rows: ${job.rows_loaded}`,
           charts: [],
           table: { columns: [], rows: [] },
         });
@@ -113,6 +116,8 @@ const ChatPage = () => {
         error={error}
         clearError={clearError}
         onDatasetUpload={handleDatasetUpload}
+        uploadMode={uploadMode}
+        onUploadModeChange={setUploadMode}
       />
     </div>
   );
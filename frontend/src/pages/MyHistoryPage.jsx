@@ -6,14 +6,23 @@ import autoTable from "jspdf-autotable";
 
 const MyHistoryPage = () => {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
-  useEffect(() => {
-    fetchMyHistory()
+  const loadPage = (cursor) => {
+    setLoading(true);
+    fetchMyHistory(cursor)
       .then((res) => {
-        if (res.success) setHistory(res.history);
+        if (res.success) {
+          setHistory((prev) => (cursor ? [...prev, ...res.history] : res.history));
+          setNextCursor(res.next_cursor);
+        }
       })
       .finally(() => setLoading(false));
+  };
+
+  useEffect(() => {
+    loadPage(null);
   }, []);
 
   const exportPDF = (record) => {
@@ -117,6 +126,12 @@ const MyHistoryPage = () => {
           </div>
         </div>
       ))}
+
+      {!loading && nextCursor && (
+        <button className="btn btn-outline-secondary" onClick={() => loadPage(nextCursor)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 };